@@ -1,12 +1,24 @@
 from django.contrib import admin
 from .models import Post, Category, Comment, Tag
+from .tasks import rerender_posts
 
+RERENDER_BATCH_SIZE = 200
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'created_at', 'updated_at', 'published_at']
+    list_display = ['title', 'author', 'created_at', 'updated_at', 'published_at', 'status']
+    list_filter = ['status']
     prepopulated_fields = {'slug': ('title',)}
+    actions = ['rerender']
+
+    @admin.action(description="Re-render selected posts")
+    def rerender(self, request, queryset):
+        # Rendered by `runworker`, not in the web server's request
+        ids = list(queryset.values_list('pk', flat=True))
+        for start in range(0, len(ids), RERENDER_BATCH_SIZE):
+            rerender_posts.delay(ids[start:start + RERENDER_BATCH_SIZE])
+        self.message_user(request, f"Queued {len(ids)} post(s) for re-rendering.")
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -0,0 +1,81 @@
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+
+from . import views
+from .cache import LISTING_SCOPE, cache_anonymous_page, category_scope, post_scope, tag_scope
+from .conditional import (
+    category_validators,
+    conditional_page,
+    post_detail_validators,
+    post_list_validators,
+    tag_validators,
+)
+from .forms import CommentForm
+from .models import Post, Category, Tag
+from .pagination import apaginate_comments, apaginate_posts, apaginate_search_results
+from .related import arelated_posts_for
+from .search import search_posts
+
+# Async versions of the blog read views, routed instead of the ones in views.py when BLOG_ASYNC_VIEWS
+# is on (the default under core/asgi.py). Queries go through the async ORM and Markdown renders on its
+# own bounded thread pool. Templates render in the request's sync thread, since context processors
+# (session, messages, header) still use the sync ORM.
+arender = sync_to_async(render)
+
+
+# List all posts (Home page)
+@conditional_page(post_list_validators)
+@cache_anonymous_page(lambda: [LISTING_SCOPE])
+async def post_list(request):
+    query = request.GET.get('q', '').strip()
+    if query:
+        posts = await apaginate_search_results(request, search_posts(query).for_listing())
+    else:
+        posts = await apaginate_posts(request, Post.objects.published().for_listing())
+
+    context = {
+        'query': query,
+        'posts': posts,
+    }
+    return await arender(request, 'blog/post_list.html', context)
+
+# Display a single post
+@conditional_page(post_detail_validators)
+@cache_anonymous_page(lambda slug: [post_scope(slug)])
+async def post_detail(request, slug):
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(views.post_detail)(request, slug)  # Comment submissions
+
+    post = await Post.objects.select_related('author').filter(slug=slug).afirst()
+    if post is None:
+        return await sync_to_async(views.renamed_post_redirect)(request, slug)
+    context = {
+        'post': post,
+        'post_content_html': await post.aget_markdown(),
+        'comments': await apaginate_comments(post, 1),
+        'comment_form': CommentForm(post=post),
+        'related_posts': await arelated_posts_for(post),
+    }
+    return await arender(request, 'blog/post_detail.html', context)
+
+# Category-based post listing
+@conditional_page(category_validators)
+@cache_anonymous_page(lambda slug: [category_scope(slug)])
+async def post_list_by_category(request, slug):
+    category = await aget_object_or_404(Category, slug=slug)
+    context = {
+        'category': category,
+        'posts': await apaginate_posts(request, category.posts.published().for_listing()),
+    }
+    return await arender(request, 'blog/post_list_by_category.html', context)
+
+# Tag-based post listing
+@conditional_page(tag_validators)
+@cache_anonymous_page(lambda slug: [tag_scope(slug)])
+async def post_list_by_tag(request, slug):
+    tag = await aget_object_or_404(Tag, slug=slug)
+    context = {
+        'tag': tag,
+        'posts': await apaginate_posts(request, tag.posts.published().for_listing()),
+    }
+    return await arender(request, 'blog/post_list_by_tag.html', context)
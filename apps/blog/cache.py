@@ -0,0 +1,142 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from .conditional import has_pending_messages, validated_etag
+
+# Every cached page records the versions of the scopes it was rendered from (the post list, one post,
+# one category, one tag). Bumping a scope's version orphans exactly the pages built from it.
+VERSION_KEY = 'blog:scope:{}'
+PAGE_KEY = 'blog:page:{}'
+
+LISTING_SCOPE = 'posts'
+
+
+def page_cache():
+    return caches[getattr(settings, 'BLOG_PAGE_CACHE_ALIAS', 'default')]
+
+
+def page_cache_timeout():
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 300)
+
+
+def post_scope(slug):
+    return f'post:{slug}'
+
+
+def category_scope(slug):
+    return f'category:{slug}'
+
+
+def tag_scope(slug):
+    return f'tag:{slug}'
+
+
+def new_version():
+    # Time based rather than incremented, so an evicted version key can never come back as an old value
+    return time.time_ns()
+
+
+def scope_versions(scopes):
+    cache = page_cache()
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def set_new_versions(scopes):
+    version = new_version()
+    page_cache().set_many({VERSION_KEY.format(scope): version for scope in scopes}, None)
+
+
+def bump_scopes(*scopes):
+    """
+    Invalidate every cached page built from any of `scopes`.
+
+    Inside a transaction the scopes are bumped again once it commits: a request served in between
+    still reads the old rows, and would cache them under the version bumped first.
+    """
+    scopes = {scope for scope in scopes if scope}
+    if scopes:
+        set_new_versions(scopes)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: set_new_versions(scopes))
+
+
+def page_key(request, scopes):
+    versions = scope_versions(scopes)
+    # The validators run first; a page whose ETag changed without a scope bump is rebuilt, not
+    # served under the new ETag
+    raw = f'{request.method}:{request.get_full_path()}:{validated_etag(request)}:{versions}'
+    return PAGE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def is_cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def bypasses_page_cache(request):
+    return (
+        not getattr(settings, 'BLOG_PAGE_CACHE', False)
+        or request.method not in ('GET', 'HEAD')
+        or request.user.is_authenticated
+        or has_pending_messages(request)
+    )
+
+
+def cache_anonymous_page(scopes_func):
+    """
+    Serve anonymous GETs from the page cache when `BLOG_PAGE_CACHE` is enabled.
+
+    `scopes_func(**view_kwargs)` names the scopes the page is built from; see `bump_scopes`.
+    Requests from logged-in users, or with pending flash messages, always reach the view.
+    Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # The session user and messages may query the database: not on the event loop
+                if not getattr(settings, 'BLOG_PAGE_CACHE', False) or await sync_to_async(bypasses_page_cache)(request):
+                    return await view(request, *args, **kwargs)
+
+                key = await sync_to_async(page_key)(request, scopes_func(*args, **kwargs))
+                response = await page_cache().aget(key)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    if is_cacheable(response):
+                        await page_cache().aset(key, response, page_cache_timeout())
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if bypasses_page_cache(request):
+                return view(request, *args, **kwargs)
+
+            key = page_key(request, scopes_func(*args, **kwargs))
+            response = page_cache().get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if is_cacheable(response):
+                    page_cache().set(key, response, page_cache_timeout())
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def rate_limit_cache_check(app_configs, **kwargs):
+    # A per-process cache counts each worker's requests apart: the real limit grows with the workers
+    alias = getattr(settings, 'BLOG_RATE_LIMIT_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if settings.DEBUG or not backend.endswith('.LocMemCache'):
+        return []
+    return [
+        Warning(
+            f"BLOG_RATE_LIMIT_CACHE ({alias!r}) is a per-process LocMemCache.",
+            hint="Comment rate limits multiply by the number of worker processes; use a cache they share.",
+            id='blog.W001',
+        )
+    ]
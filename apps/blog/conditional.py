@@ -0,0 +1,194 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.db.models.functions import Greatest
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import Post
+
+
+def viewer_key(request):
+    # Logged-in pages carry per-user bits (header, comment forms), so their validators differ per user
+    return f'user-{request.user.pk}' if request.user.is_authenticated else 'anon'
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def validators(compute):
+    """
+    Build the etag and last-modified functions for `condition` from one `compute(request, **kwargs)`.
+
+    `compute` returns an (etag, last_modified) pair or None. It runs once per request, so both
+    validators cost a single query.
+    """
+    def cached(request, *args, **kwargs):
+        if not hasattr(request, '_blog_validators'):
+            request._blog_validators = compute(request, *args, **kwargs) or (None, None)
+        return request._blog_validators
+
+    def etag_func(request, *args, **kwargs):
+        return cached(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return cached(request, *args, **kwargs)[1]
+
+    return etag_func, last_modified_func
+
+
+def validated_etag(request):
+    """The ETag computed by the validators of this request, if any."""
+    return getattr(request, '_blog_validators', (None, None))[0]
+
+
+def validated_last_modified(request):
+    """The last-modified time computed by the validators of this request, if any."""
+    return getattr(request, '_blog_validators', (None, None))[1]
+
+
+def has_pending_messages(request):
+    # Counting does not mark the messages as shown
+    return len(messages.get_messages(request)) > 0
+
+
+def conditional_page(compute):
+    """
+    Answer conditional GETs with 304 Not Modified when `compute` says the page has not changed.
+
+    Responses vary on the session cookie; anonymous pages may be revalidated by shared caches,
+    logged-in pages are private. A request with pending flash messages always gets the full page,
+    so they are shown now. Works on sync and async views.
+    """
+    etag_func, last_modified_func = validators(compute)
+
+    def patch_headers(response, authenticated):
+        patch_vary_headers(response, ('Cookie',))
+        if authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        return response
+
+    def prepare(request, *args, **kwargs):
+        # Everything that queries the database before the view: the session user and messages, and
+        # the validators when they are needed
+        if has_pending_messages(request):
+            return request.user.is_authenticated, True
+        last_modified_func(request, *args, **kwargs)
+        return request.user.is_authenticated, False
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                authenticated, pending = await sync_to_async(prepare)(request, *args, **kwargs)
+                response = await (view if pending else conditional_view)(request, *args, **kwargs)
+                # A page carrying messages is for this visitor only
+                return patch_headers(response, authenticated or pending)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            pending = has_pending_messages(request)
+            response = (view if pending else conditional_view)(request, *args, **kwargs)
+            return patch_headers(response, request.user.is_authenticated or pending)
+
+        return wrapper
+
+    return decorator
+
+
+def conditional_feed(compute):
+    """
+    Answer conditional GETs of a feed with 304 Not Modified when `compute` says it has not changed.
+
+    Feeds are the same for every reader, so they may be cached publicly for `BLOG_FEED_MAX_AGE` seconds.
+    """
+    etag_func, last_modified_func = validators(compute)
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, public=True, max_age=getattr(settings, 'BLOG_FEED_MAX_AGE', 300))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def post_detail_validators(request, slug):
+    row = Post.objects.filter(slug=slug).values(
+        'pk', 'updated_at', 'comments_updated_at', 'comment_count', 'content_hash', 'render_version'
+    ).first()
+    if row is None:
+        return None
+    last_modified = max(filter(None, (row['updated_at'], row['comments_updated_at'])))
+    # A re-render changes the HTML without touching updated_at
+    etag = make_etag(
+        'post', row['pk'], last_modified.timestamp(), row['comment_count'],
+        row['content_hash'], row['render_version'], viewer_key(request),
+    )
+    return etag, last_modified
+
+
+def listing_summary(posts):
+    return posts.order_by().aggregate(
+        # A scheduled post becomes visible at published_at without its updated_at changing
+        last_modified=Max(Greatest('updated_at', 'published_at')),
+        total=Count('pk'),
+    )
+
+
+def listing_validators(posts, request, scope):
+    # Search results depend on the ranking, not only on post timestamps
+    if request.GET.get('q'):
+        return None
+    summary = listing_summary(posts)
+    if summary['last_modified'] is None:
+        return None
+    etag = make_etag(scope, summary['last_modified'].timestamp(), summary['total'], viewer_key(request))
+    return etag, summary['last_modified']
+
+
+def post_list_validators(request):
+    return listing_validators(Post.objects.published(), request, 'posts')
+
+
+def category_validators(request, slug):
+    return listing_validators(Post.objects.published().filter(categories__slug=slug), request, f'category-{slug}')
+
+
+def tag_validators(request, slug):
+    return listing_validators(Post.objects.published().filter(tags__slug=slug), request, f'tag-{slug}')
+
+
+def feed_validators(posts, scope, fmt):
+    summary = listing_summary(posts)
+    if summary['last_modified'] is None:
+        return None
+    return make_etag('feed', fmt, scope, summary['last_modified'].timestamp(), summary['total']), summary['last_modified']
+
+
+def post_feed_validators(request, fmt):
+    return feed_validators(Post.objects.published(), 'posts', fmt)
+
+
+def category_feed_validators(request, slug, fmt):
+    return feed_validators(Post.objects.published().filter(categories__slug=slug), f'category-{slug}', fmt)
+
+
+def tag_feed_validators(request, slug, fmt):
+    return feed_validators(Post.objects.published().filter(tags__slug=slug), f'tag-{slug}', fmt)
@@ -0,0 +1,66 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Category, Post, Tag
+
+# model -> (through model, column of the model in it)
+TAXONOMIES = {
+    Category: (Post.categories.through, 'category_id'),
+    Tag: (Post.tags.through, 'tag_id'),
+}
+
+
+def adjust_post_counts(model, deltas):
+    """Add `deltas` ({pk: delta}) to the post counters of `model`, one UPDATE per distinct delta."""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(post_count=F('post_count') + delta)
+
+
+def crossed_zero(model, deltas):
+    """Whether counters just moved by `deltas` went from or to zero, showing or hiding their rows."""
+    crossed = Q()
+    for pk, delta in deltas.items():
+        if delta:
+            # Up by delta from zero, or down to zero
+            crossed |= Q(pk=pk, post_count=max(delta, 0))
+    return bool(crossed) and model.objects.filter(crossed).exists()
+
+
+def count_links(model, post_ids):
+    """How many of the posts `post_ids` each `model` row is linked to, as a Counter."""
+    through, column = TAXONOMIES[model]
+    rows = through.objects.filter(post_id__in=post_ids).values(column).annotate(n=Count('pk')).values_list(column, 'n')
+    return Counter(dict(rows))
+
+
+def posts_became_visible(post_ids, delta=1):
+    """Count (or with `delta=-1` uncount) the given posts in the counters of their categories and tags."""
+    for model in TAXONOMIES:
+        adjust_post_counts(model, {pk: n * delta for pk, n in count_links(model, post_ids).items()})
+
+
+def published_count(model):
+    through, column = TAXONOMIES[model]
+    return Coalesce(
+        Subquery(
+            through.objects.filter(**{column: OuterRef('pk')}, post__status=Post.Status.PUBLISHED)
+            .order_by().values(column).annotate(n=Count('pk')).values('n')
+        ),
+        0,
+    )
+
+
+def rebuild_post_counts():
+    """Recompute every counter from the link tables, one UPDATE per model. Returns the rows updated."""
+    return sum(model.objects.update(post_count=published_count(model)) for model in TAXONOMIES)
+
+
+def top_by_posts(model, limit):
+    """The `limit` categories or tags with the most published posts, through the counter index."""
+    return list(model.objects.filter(post_count__gt=0).order_by('-post_count', 'name')[:limit])
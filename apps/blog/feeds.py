@@ -0,0 +1,183 @@
+"""
+RSS 2.0, Atom 1.0 and JSON Feed 1.1 feeds of the published posts: all of them, per category and per tag.
+
+Feeds are written item by item, from the pre-rendered HTML of the posts, into a streamed response:
+the body is never held as one string while it is generated. A complete body is also kept in the
+page cache, keyed on the feed's ETag and the versions of the scopes the feed is built from (see
+apps/blog/cache.py), so it is generated once per content change. Conditional GETs are answered by the views' validators.
+"""
+import hashlib
+import json
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .cache import page_cache, scope_versions
+from .conditional import validated_etag
+
+FEED_KEY = 'blog:feed:{}'
+
+# Chunks sent to the client are at least this long
+CHUNK_SIZE = 16 * 1024
+
+
+class StreamedFeed:
+    """A `feedgenerator` feed written as chunks, its items pulled from an iterator."""
+
+    items_end = None  # The closing tag the items go before
+
+    def __init__(self, *args, updated=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.updated = updated
+
+    def latest_post_date(self):
+        # Known from the validators; the items are not all in memory to look at
+        return self.updated or super().latest_post_date()
+
+    def stream(self, items):
+        shell = self.writeString('utf-8')  # The feed without items
+        split = shell.rindex(self.items_end)
+        buffer = StringIO()
+        buffer.write(shell[:split])
+        handler = SimplerXMLGenerator(buffer, 'utf-8', short_empty_elements=True)
+        for item in items:
+            self.items = []
+            self.add_item(**item)
+            self.write_items(handler)
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue() + shell[split:]
+
+
+class RssFeed(StreamedFeed, Rss201rev2Feed):
+    items_end = '</channel>'
+
+
+class AtomFeed(StreamedFeed, Atom1Feed):
+    items_end = '</feed>'
+
+
+def json_feed(meta, items):
+    """JSON Feed 1.1 chunks for the feed `meta` (as for `feedgenerator`) and `items`."""
+    head = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': meta['title'],
+        'home_page_url': meta['link'],
+        'feed_url': meta['feed_url'],
+        'description': meta['description'],
+    }
+    chunk = json.dumps(head)[:-1] + ', "items": ['
+    for index, item in enumerate(items):
+        chunk += (', ' if index else '') + json.dumps({
+            'id': item['unique_id'],
+            'url': item['link'],
+            'title': item['title'],
+            'content_html': item['description'],
+            'date_published': item['pubdate'].isoformat(),
+            'date_modified': item['updateddate'].isoformat(),
+            'authors': [{'name': item['author_name']}],
+            'tags': item['categories'],
+        })
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = ''
+    yield chunk + ']}'
+
+
+FORMATS = {
+    'rss': (RssFeed, 'application/rss+xml; charset=utf-8'),
+    'atom': (AtomFeed, 'application/atom+xml; charset=utf-8'),
+    'json': (None, 'application/feed+json; charset=utf-8'),
+}
+
+
+def feed_items(request, posts):
+    """`feedgenerator` item arguments for the newest `BLOG_FEED_ITEMS` of `posts`, fetched in batches."""
+    posts = (
+        posts.select_related('author')
+        .prefetch_related('categories', 'tags')
+        .defer('toc_html', 'toc')
+        .order_by('-published_at', '-id')[:getattr(settings, 'BLOG_FEED_ITEMS', 50)]
+    )
+    for post in posts.iterator(chunk_size=100):
+        url = request.build_absolute_uri(post.get_absolute_url())
+        yield {
+            'title': post.title,
+            'link': url,
+            'unique_id': url,
+            'description': post.get_markdown(),
+            'pubdate': post.published_at,
+            'updateddate': post.updated_at,
+            'author_name': post.author.username,
+            'categories': [taxonomy.name for taxonomy in [*post.categories.all(), *post.tags.all()]],
+        }
+
+
+def feed_chunks(request, fmt, posts, meta, updated):
+    feed_class = FORMATS[fmt][0]
+    items = feed_items(request, posts)
+    if feed_class is None:
+        return json_feed(meta, items)
+    return feed_class(**meta, updated=updated).stream(items)
+
+
+def cached_stream(key, chunks):
+    """Pass `chunks` through, then cache the whole body under `key` unless it outgrew `BLOG_FEED_CACHE_MAX_SIZE`."""
+    parts, size = [], 0
+    limit = getattr(settings, 'BLOG_FEED_CACHE_MAX_SIZE', 1024 * 1024)
+    for chunk in chunks:
+        yield chunk
+        if parts is not None:
+            parts.append(chunk)
+            size += len(chunk)
+            if size > limit:
+                parts = None
+    if parts is not None:
+        page_cache().set(key, ''.join(parts), getattr(settings, 'BLOG_FEED_CACHE_TIMEOUT', 60 * 60))
+
+
+async def chunks_in_thread(chunks):
+    # ASGI serves async iterators; the generator queries the database, so each step runs in the sync thread
+    step = sync_to_async(next)
+    while (chunk := await step(chunks, None)) is not None:
+        yield chunk
+
+
+def feed_response(request, fmt, posts, scopes, title, link, description, updated=None):
+    """
+    The `fmt` feed of `posts`, from the cache while `scopes` and the validators' ETag are unchanged,
+    otherwise streamed.
+
+    `link` is the path of the HTML page the feed mirrors; `updated` the newest post timestamp.
+    """
+    if fmt not in FORMATS:
+        raise Http404("Unknown feed format")
+    content_type = FORMATS[fmt][1]
+    feed_url = request.build_absolute_uri()
+    # The ETag comes from the database, so a body cached before a change another process made (and
+    # whose scope bump this process's cache never saw) is not served under the new ETag
+    raw = f'{fmt}:{feed_url}:{validated_etag(request)}:{scope_versions(scopes)}'
+    key = FEED_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+    body = page_cache().get(key)
+    if body is not None:
+        return HttpResponse(body, content_type=content_type)
+
+    meta = {
+        'title': title,
+        'link': request.build_absolute_uri(link),
+        'feed_url': feed_url,
+        'description': description,
+        'language': settings.LANGUAGE_CODE,
+    }
+    chunks = cached_stream(key, feed_chunks(request, fmt, posts, meta, updated))
+    if isinstance(request, ASGIRequest):
+        chunks = chunks_in_thread(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
@@ -14,7 +14,21 @@ class PostForm(forms.ModelForm):
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
-        fields = ["content"]
+        fields = ["content", "parent"]
         widgets = {
             "content": forms.Textarea(attrs={"placeholder": "Write a comment..."}),
+            "parent": forms.HiddenInput(),
         }
+
+    def __init__(self, *args, post=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only comments of the same post can be replied to
+        if post is not None:
+            self.fields["parent"].queryset = post.comments.all()
+
+    def clean_parent(self):
+        # Threads are one level deep: a reply to a reply joins the top-level thread
+        parent = self.cleaned_data.get("parent")
+        if parent is not None and parent.parent_id:
+            return parent.parent
+        return parent
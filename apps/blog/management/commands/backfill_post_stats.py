@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.cache import LISTING_SCOPE, bump_scopes, post_scope
+from apps.blog.models import Post
+from apps.blog.rendering import RenderService
+
+
+class Command(BaseCommand):
+    help = "Fill in the word count, reading time and table of contents of posts saved before they were stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--processes", type=int, default=None,
+            help="Rendering processes (default: MARKDOWN_RENDER_PROCESSES, or one per CPU; 1 renders inline).",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.filter(word_count__isnull=True)
+        slugs = list(posts.values_list("slug", flat=True))
+        # The stats come from the rendered HTML, so the posts are rendered again in the same pass
+        with RenderService(processes=options["processes"]) as service:
+            count = posts.rerender(service=service, batch_size=options["batch_size"])
+
+        bump_scopes(LISTING_SCOPE, *map(post_scope, slugs))  # Cards and pages show the new fields
+        self.stdout.write(self.style.SUCCESS(f"Filled in reading stats for {count} post(s)."))
@@ -0,0 +1,39 @@
+import json
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.blog.models import Post
+from apps.blog.transfer import export_posts, markdown_file
+
+
+class Command(BaseCommand):
+    help = "Export posts as JSON lines or as Markdown files with YAML front matter, readable by blog_import."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="A .jsonl file ('-' for stdout), or a directory for --format markdown.")
+        parser.add_argument("--format", choices=["jsonl", "markdown"], default="jsonl")
+        parser.add_argument("--published", action="store_true", help="Only published posts.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.published() if options["published"] else Post.objects.all()
+        records = export_posts(posts, batch_size=options["batch_size"])
+        output = options["output"]
+
+        count = 0
+        if options["format"] == "markdown":
+            if output == "-":
+                raise CommandError("Markdown export needs a directory.")
+            directory = Path(output)
+            directory.mkdir(parents=True, exist_ok=True)
+            for count, record in enumerate(records, 1):
+                (directory / f"{record['slug']}.md").write_text(markdown_file(record), encoding="utf-8")
+        else:
+            with nullcontext(self.stdout) if output == "-" else open(output, "w", encoding="utf-8") as out:
+                for count, record in enumerate(records, 1):
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        if output != "-":
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} post(s) to {output}."))
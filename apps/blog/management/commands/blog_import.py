@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from apps.blog.transfer import Importer, read_jsonl, read_paths
+
+
+class Command(BaseCommand):
+    help = (
+        "Import posts from JSON lines or Markdown files with YAML front matter (see apps/blog/transfer.py). "
+        "Posts whose slug exists are updated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Files or directories of .jsonl/.md files; '-' reads JSON lines from stdin.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Records written per transaction.")
+        parser.add_argument(
+            "--processes", type=int, default=None, help="Markdown rendering processes (default: one per CPU, 1: none)."
+        )
+        parser.add_argument("--author", help="Username for records without an author or with an unknown one.")
+
+    def handle(self, *args, **options):
+        paths = options["paths"]
+        records = read_jsonl(sys.stdin) if paths == ["-"] else read_paths(paths)
+        importer = Importer(
+            batch_size=options["batch_size"],
+            processes=options["processes"],
+            default_author=options["author"],
+            progress=self.stdout.write,
+        )
+        try:
+            created, updated = importer.run(records)
+        except (ValueError, IntegrityError) as error:
+            raise CommandError(f"Import stopped, batches written so far are kept: {error}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {created + updated} post(s): {created} new, {updated} updated."))
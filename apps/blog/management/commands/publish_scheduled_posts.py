@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.blog.scheduling import publish_due_posts
+
+
+class Command(BaseCommand):
+    help = "Publish scheduled posts whose publication time has passed. Run from cron, or with --interval as a scheduler."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running and check every INTERVAL seconds instead of exiting after one pass.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = publish_due_posts(batch_size=options["batch_size"])
+            if count or not options["interval"]:
+                self.stdout.write(self.style.SUCCESS(f"Published {count} scheduled post(s)."))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed related-posts table from shared tags and categories."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_related_posts(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt related posts for {count} post(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite FTS5 search index of posts (PostgreSQL uses an expression index and needs no rebuild)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} post(s)."))
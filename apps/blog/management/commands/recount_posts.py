@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.cache import LISTING_SCOPE, bump_scopes
+from apps.blog.counters import rebuild_post_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the published-post counters of every category and tag from the link tables."
+
+    def handle(self, *args, **options):
+        count = rebuild_post_counts()
+        bump_scopes(LISTING_SCOPE)  # The sidebar shows the counters
+        self.stdout.write(self.style.SUCCESS(f"Recounted posts for {count} categories and tags."))
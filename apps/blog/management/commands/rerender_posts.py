@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.blog.cache import bump_scopes
+from apps.blog.models import Post
+from apps.blog.rendering import RENDERER_VERSION, RenderService
+from apps.blog.signals import posts_page_scopes
+from apps.blog.tasks import rerender_posts
+
+
+class Command(BaseCommand):
+    help = "Re-render the stored Markdown HTML of posts rendered by an older renderer version."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Re-render every post, not only stale ones.")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--processes", type=int, default=None,
+            help="Rendering processes (default: MARKDOWN_RENDER_PROCESSES, or one per CPU; 1 renders inline).",
+        )
+        parser.add_argument(
+            "--enqueue", action="store_true", help="Queue one task per batch for `runworker` instead of rendering here."
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        posts = Post.objects.order_by("pk")
+        if not options["force"]:
+            posts = posts.filter(~Q(render_version=RENDERER_VERSION) | Q(content_hash=""))
+
+        ids = list(posts.values_list("pk", flat=True))
+        if options["enqueue"]:
+            for start in range(0, len(ids), batch_size):
+                rerender_posts.delay(ids[start:start + batch_size])
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(ids)} post(s) for re-rendering."))
+            return
+
+        with RenderService(processes=options["processes"]) as service:
+            rendered = Post.objects.filter(pk__in=ids).rerender(service=service, batch_size=batch_size)
+        bump_scopes(*posts_page_scopes(ids))  # Bulk updates skip the signals
+
+        self.stdout.write(self.style.SUCCESS(f"Re-rendered {rendered} post(s) with renderer {RENDERER_VERSION}."))
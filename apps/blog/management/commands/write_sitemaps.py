@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.sitemaps import sitemap_root, write_sitemaps
+
+
+class Command(BaseCommand):
+    help = "Regenerate the sitemap index and its shards of posts, categories, tags and profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", help="Site URL the sitemaps point at (default: SITEMAP_BASE_URL).")
+
+    def handle(self, *args, **options):
+        shards = write_sitemaps(base_url=options["base_url"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(shards)} sitemap shard(s) to {sitemap_root()}."))
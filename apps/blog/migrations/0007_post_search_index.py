@@ -0,0 +1,44 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:05
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts "
+            "USING fts5(title, content, tags, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO blog_post_fts(rowid, title, content, tags) "
+            "SELECT p.id, p.title, p.content, "
+            "(SELECT group_concat(t.name, ' ') FROM blog_tag t JOIN blog_tag_posts tp ON tp.tag_id = t.id "
+            "WHERE tp.post_id = p.id) FROM blog_post p"
+        )
+    elif vendor == 'postgresql':
+        # Same expression as apps.blog.search.PG_DOCUMENT
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS blog_post_search_idx ON blog_post USING gin (("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS blog_post_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS blog_post_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_related_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
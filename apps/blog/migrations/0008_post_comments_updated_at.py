@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_post_counts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    for model, column in ((apps.get_model('blog', 'Category'), 'category_id'), (apps.get_model('blog', 'Tag'), 'tag_id')):
+        through = Post.categories.through if column == 'category_id' else model.posts.through
+        published = (
+            through.objects.filter(**{column: OuterRef('pk')}, post__status='published')
+            .order_by().values(column).annotate(n=Count('pk')).values('n')
+        )
+        model.objects.update(post_count=Coalesce(Subquery(published), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['-post_count', 'name'], name='blog_category_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-post_count', 'name'], name='blog_tag_count_idx'),
+        ),
+        migrations.RunPython(backfill_post_counts, migrations.RunPython.noop),
+    ]
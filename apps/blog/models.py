@@ -1,29 +1,91 @@
-from django.db import models
-from django.utils.text import slugify
+import html
+import math
+import re
+from contextlib import nullcontext
+from itertools import islice
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 from django.contrib.auth.models import User
-from markdown import markdown
 from django.utils import timezone
 from django.urls import reverse
 
+from core.images import srcset
+from core.instrumentation import timed
+
+from .rendering import RENDERER_VERSION, RenderService, content_digest, render_document, run_in_render_pool
+from .slugs import allocate_slug, derived_from, save_retrying_slug
+
+WORD = re.compile(r"\w")  # Tokens without a letter or digit, such as "&" or "-", are not words
+
 # Category Model
 class Category(models.Model):
     name = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(unique=True, blank=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False)  # Published posts; see apps/blog/counters.py
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        self.slug = allocate_slug(type(self), self.name, self.pk)
+        save_retrying_slug(self, self.name, lambda: super(Category, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
 
     def get_absolute_url(self):
-        return reverse('category_detail', kwargs={'slug': self.slug})
+        return reverse('blog:post_list_by_category', kwargs={'slug': self.slug})
+
+    class Meta:
+        indexes = [
+            # The sidebar's top-N by published posts
+            models.Index(fields=['-post_count', 'name'], name='blog_category_count_idx'),
+        ]
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        # An indexed equality instead of comparing published_at with now(); scheduled posts are
+        # flipped to published by apps/blog/scheduling.py when their time comes
+        return self.filter(status=Post.Status.PUBLISHED)
+
+    def for_listing(self):
+        """Only what listing cards show: no Markdown source or HTML, author joined, categories and tags prefetched."""
+        return (
+            self.defer('content', 'content_html', 'toc_html', 'toc')
+            .select_related('author')
+            .prefetch_related('categories', 'tags')
+        )
+
+    def rerender(self, service=None, batch_size=200):
+        """
+        Re-render the stored HTML of these posts, `batch_size` at a time, on the processes of a
+        `RenderService` (`service`, or one started for the call). Returns the number of posts.
+        """
+        posts = self.only('id', 'content', *Post.RENDER_FIELDS).order_by('pk').iterator(chunk_size=batch_size)
+        count = 0
+        with nullcontext(service) if service else RenderService() as service:
+            pending = None
+            while batch := list(islice(posts, batch_size)):
+                # The next batch renders while the previous one is written
+                documents = service.submit([post.content for post in batch])
+                if pending:
+                    count += Post.store_rendered(*pending)
+                pending = batch, documents
+            if pending:
+                count += Post.store_rendered(*pending)
+        return count
 
 
 # Post Model
 class Post(models.Model):
+    class Status(models.TextChoices):
+        DRAFT = 'draft', 'Draft'
+        SCHEDULED = 'scheduled', 'Scheduled'
+        PUBLISHED = 'published', 'Published'
+
     title = models.CharField(max_length=255)
     slug = models.SlugField(unique=True, blank=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")  # Added related_name for clarity
@@ -31,26 +93,149 @@ class Post(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.DRAFT, editable=False)  # Derived from published_at on save
     categories = models.ManyToManyField(Category, related_name="posts", blank=True)  # `blank=True` to allow empty categories
     image = models.ImageField(upload_to='blog_images/', null=True, blank=True)
 
+    # Pre-rendered Markdown, refreshed on save when the content or the renderer changes
+    content_html = models.TextField(blank=True, editable=False)
+    toc_html = models.TextField(blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    render_version = models.CharField(max_length=12, blank=True, editable=False, db_index=True)
+    excerpt = models.CharField(max_length=300, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(null=True, blank=True, editable=False)  # None until rendered since these were added
+    reading_time = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)  # Minutes
+    toc = models.JSONField(default=list, blank=True, editable=False)  # Heading tree, see rendering.toc_outline()
+    comment_count = models.PositiveIntegerField(default=0, editable=False)  # Kept in sync by apps/blog/signals.py
+    comments_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    EXCERPT_LENGTH = 300
+    RENDER_FIELDS = [
+        'content_html', 'toc_html', 'content_hash', 'render_version', 'excerpt', 'word_count', 'reading_time', 'toc',
+    ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the row held, to notice title and slug edits on save
+        instance._loaded_values = dict(zip(field_names, (value for value in values if value is not models.DEFERRED)))
+        return instance
+
+    @classmethod
+    def retired_slugs(cls, exclude_pk=None):
+        # Old slugs keep redirecting to their post, so they are not handed out again
+        return SlugHistory.objects.exclude(post_id=exclude_pk)
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+        loaded = getattr(self, '_loaded_values', {})
+        previous_slug = loaded.get('slug')
+        title_edited = 'title' in loaded and loaded['title'] != self.title
+        allocated = not self.slug or (
+            title_edited and self.slug == previous_slug and derived_from(Post, loaded['title'], self.slug)
+        )
+        if allocated:
+            # The slug follows the title, unless it was set by hand
+            self.slug = allocate_slug(Post, self.title, self.pk)
+        self._previous_slug = previous_slug if previous_slug and previous_slug != self.slug else None
+
+        self.status = self.status_for(self.published_at)
+        rendered = self.render_content()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {
+                *kwargs['update_fields'], 'status', *(self.RENDER_FIELDS if rendered else []),
+                *(['slug'] if self._previous_slug else []),
+            }
+
+        def write():
+            with transaction.atomic():
+                super(Post, self).save(*args, **kwargs)
+                if self._previous_slug:
+                    SlugHistory.objects.filter(slug=self.slug).delete()  # Back to one of its own old slugs
+                    SlugHistory.objects.update_or_create(slug=self._previous_slug, defaults={'post': self})
+
+        if allocated:
+            save_retrying_slug(self, self.title, write)
+        else:
+            write()
+        self._loaded_values = {**loaded, 'title': self.title, 'slug': self.slug}
+
+    @classmethod
+    def status_for(cls, published_at):
+        if published_at is None:
+            return cls.Status.DRAFT
+        if published_at > timezone.now():
+            return cls.Status.SCHEDULED
+        return cls.Status.PUBLISHED
 
     def __str__(self):
         return self.title
 
     def get_absolute_url(self):
-        return reverse('post_detail', kwargs={'slug': self.slug})
+        return reverse('blog:post_detail', kwargs={'slug': self.slug})
+
+    @property
+    def needs_render(self):
+        return (
+            self.render_version != RENDERER_VERSION
+            or self.content_hash != content_digest(self.content)
+            or self.word_count is None
+        )
+
+    def render_content(self, force=False):
+        """Refresh the stored HTML if it is stale. Returns True when the post was re-rendered."""
+        if not force and not self.needs_render:
+            return False
+        self.set_rendered(render_document(self.content))
+        return True
+
+    @classmethod
+    def store_rendered(cls, posts, documents):
+        for post, document in zip(posts, documents):
+            post.set_rendered(document)
+        cls.objects.bulk_update(posts, cls.RENDER_FIELDS)
+        return len(posts)
+
+    def set_rendered(self, document):
+        """Store a `RenderedDocument` of the current content, rendered here or elsewhere (bulk imports)."""
+        self.content_html = document.html
+        self.toc_html = document.toc
+        self.toc = document.toc_tokens
+        # Plain text: the templates escape the excerpt themselves
+        words = html.unescape(strip_tags(document.html)).split()
+        self.excerpt = Truncator(" ".join(words)).chars(self.EXCERPT_LENGTH)
+        words = [word for word in words if WORD.search(word)]
+        self.word_count = len(words)
+        self.reading_time = max(1, math.ceil(len(words) / getattr(settings, 'BLOG_WORDS_PER_MINUTE', 200)))
+        self.content_hash = content_digest(self.content)
+        self.render_version = RENDERER_VERSION
 
     def get_markdown(self):
-        return markdown(self.content, extensions=["fenced_code", "codehilite"])  # Added useful Markdown extensions
+        # Rows rendered by an older renderer are fixed up lazily on first read
+        with timed("markdown"):
+            rendered = self.render_content()
+        if rendered and self.pk:
+            Post.objects.filter(pk=self.pk).update(**{field: getattr(self, field) for field in self.RENDER_FIELDS})
+        return self.content_html
+
+    async def aget_markdown(self):
+        # get_markdown() for the async views: the rendering goes to the Markdown thread pool
+        if not self.needs_render:
+            return self.content_html
+        with timed("markdown"):
+            rendered = await run_in_render_pool(self.render_content)
+        if rendered and self.pk:
+            await Post.objects.filter(pk=self.pk).aupdate(**{field: getattr(self, field) for field in self.RENDER_FIELDS})
+        return self.content_html
+
+    @property
+    def image_srcset(self):
+        return srcset(self.image)
 
     @property
     def is_published(self):
-        return self.published_at is not None and self.published_at <= timezone.now()
+        return self.status == self.Status.PUBLISHED
 
     def publish(self):
         self.published_at = timezone.now()
@@ -62,21 +247,49 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-created_at']  # Newest posts first
+        indexes = [
+            # Listings: status = 'published' ordered by (-published_at, -id); also serves the
+            # scheduler's status = 'scheduled' AND published_at <= now() scan
+            models.Index(fields=['status', '-published_at', '-id'], name='blog_post_status_idx'),
+            models.Index(fields=['-created_at'], name='blog_post_created_idx'),  # Default/admin ordering
+        ]
 
 
 # Comment Model
 class Comment(models.Model):
     post = models.ForeignKey(Post, related_name='comments', on_delete=models.CASCADE)
+    parent = models.ForeignKey('self', related_name='replies', on_delete=models.CASCADE, null=True, blank=True)  # Replies are one level deep
     author = models.CharField(max_length=255)
     content = models.TextField()
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        # The post_save handler bumps Post.comment_count inside the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f'Comment by {self.author} on {self.post.title}'
 
     class Meta:
         ordering = ['created_at']  # Oldest comments first
+        indexes = [
+            models.Index(fields=['post', 'created_at'], name='blog_comment_post_created_idx'),
+        ]
+
+
+# Old slugs of renamed posts, answered with a redirect to the current slug
+class SlugHistory(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="old_slugs")
+    slug = models.SlugField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'slug history'
+
+    def __str__(self):
+        return f'{self.slug} -> {self.post_id}'
 
 
 # Tag Model
@@ -84,17 +297,42 @@ class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, blank=True)
     posts = models.ManyToManyField(Post, related_name="tags", blank=True)  # Added `posts` relationship for tagging posts
+    post_count = models.PositiveIntegerField(default=0, editable=False)  # Published posts; see apps/blog/counters.py
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        self.slug = allocate_slug(type(self), self.name, self.pk)
+        save_retrying_slug(self, self.name, lambda: super(Tag, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
 
     def get_absolute_url(self):
-        return reverse('tag_detail', kwargs={'slug': self.slug})
+        return reverse('blog:post_list_by_tag', kwargs={'slug': self.slug})
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-post_count', 'name'], name='blog_tag_count_idx'),
+        ]
+
+
+# Precomputed related posts, maintained by apps/blog/related.py
+class RelatedPost(models.Model):
+    post = models.ForeignKey(Post, related_name='related_entries', on_delete=models.CASCADE)
+    related = models.ForeignKey(Post, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    def __str__(self):
+        return f'{self.related} related to {self.post} ({self.score})'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='blog_relatedpost_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['post', '-score'], name='blog_relatedpost_score_idx'),
+        ]
 
 
 # BlogImage Model
@@ -104,3 +342,7 @@ class BlogImage(models.Model):
 
     def __str__(self):
         return self.caption or f"Image {self.id}"
+
+    @property
+    def srcset(self):
+        return srcset(self.image)
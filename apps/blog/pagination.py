@@ -0,0 +1,174 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Prefetch, Q
+
+from .models import Comment
+
+# Listings are ordered on a unique key so keyset pagination never skips or repeats rows
+LISTING_ORDER = ('-published_at', '-id')
+
+
+def encode_cursor(post):
+    raw = f"{post.published_at.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the (published_at, id) pair encoded in a cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        published_at, pk = raw.split("|")
+        return datetime.fromisoformat(published_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """
+    A page of posts fetched by seeking past a (published_at, id) cursor.
+
+    It mirrors the parts of Django's `Page` the templates use, without the OFFSET and COUNT(*) queries.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self._has_next else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) if self._has_previous else None
+
+
+def keyset_query(posts, per_page, after=None, before=None):
+    """
+    The query fetching a keyset page of `posts`, and the function turning its rows into the page.
+
+    `after` returns the page of older posts following the cursor, `before` the page of newer posts
+    preceding it. With neither, the first page is returned.
+    """
+    if before:
+        published_at, pk = before
+        newer = Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=pk)
+        rows = posts.filter(newer).order_by('published_at', 'id')[:per_page + 1]
+        # The cursor's post is older than every row, unless it was the newest and the page is empty
+        return rows, lambda rows: KeysetPage(rows[:per_page][::-1], has_next=bool(rows), has_previous=len(rows) > per_page)
+
+    posts = posts.order_by(*LISTING_ORDER)
+    if after:
+        published_at, pk = after
+        posts = posts.filter(Q(published_at__lt=published_at) | Q(published_at=published_at, id__lt=pk))
+    rows = posts[:per_page + 1]
+    return rows, lambda rows: KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=after is not None)
+
+
+def keyset_paginate(posts, per_page, after=None, before=None):
+    """Paginate `posts` (newest first) by seeking past a cursor, see `keyset_query`."""
+    rows, page = keyset_query(posts, per_page, after, before)
+    page = page(list(rows))
+    if before and not page:
+        return keyset_paginate(posts, per_page)  # Nothing newer left (a stale link): the first page
+    return page
+
+
+async def akeyset_paginate(posts, per_page, after=None, before=None):
+    rows, page = keyset_query(posts, per_page, after, before)
+    page = page([post async for post in rows])
+    if before and not page:
+        return await akeyset_paginate(posts, per_page)
+    return page
+
+
+async def aget_page(queryset, per_page, number):
+    """`Paginator(queryset, per_page).get_page(number)` through the async ORM."""
+    paginator = Paginator(queryset, per_page)
+    paginator.count = await queryset.acount()  # Cached property: the paginator does not count again
+    page = paginator.get_page(number)
+    page.object_list = [obj async for obj in page.object_list]
+    return page
+
+
+def listing_mode(request):
+    """The (after, before) cursors to seek from, or None for page-number pagination."""
+    after = decode_cursor(request.GET.get('after', ''))
+    before = decode_cursor(request.GET.get('before', ''))
+    if after or before or getattr(settings, 'BLOG_PAGINATION_MODE', 'page') == 'keyset':
+        return after, None if after else before
+    return None
+
+
+def paginate_posts(request, posts):
+    """
+    Paginate a listing of published posts for `request`.
+
+    Page-number pagination (`?page=`) is used by default. A cursor (`?after=` / `?before=`), or
+    `BLOG_PAGINATION_MODE = "keyset"`, switches to keyset pagination on (published_at, id).
+    """
+    per_page = getattr(settings, 'BLOG_POSTS_PER_PAGE', 10)
+    cursors = listing_mode(request)
+    if cursors:
+        return keyset_paginate(posts, per_page, *cursors)
+
+    paginator = Paginator(posts.order_by(*LISTING_ORDER), per_page)
+    return paginator.get_page(request.GET.get('page'))
+
+
+async def apaginate_posts(request, posts):
+    per_page = getattr(settings, 'BLOG_POSTS_PER_PAGE', 10)
+    cursors = listing_mode(request)
+    if cursors:
+        return await akeyset_paginate(posts, per_page, *cursors)
+    return await aget_page(posts.order_by(*LISTING_ORDER), per_page, request.GET.get('page'))
+
+
+def paginate_search_results(request, results):
+    """Search results keep their relevance order, so they are always paginated by page number."""
+    paginator = Paginator(results, getattr(settings, 'BLOG_POSTS_PER_PAGE', 10))
+    return paginator.get_page(request.GET.get('page'))
+
+
+async def apaginate_search_results(request, results):
+    return await aget_page(results, getattr(settings, 'BLOG_POSTS_PER_PAGE', 10), request.GET.get('page'))
+
+
+def comment_threads(post):
+    """Top-level comments of `post`, oldest first, with their replies prefetched."""
+    return post.comments.filter(parent__isnull=True).order_by('created_at', 'id').prefetch_related(
+        Prefetch('replies', queryset=Comment.objects.order_by('created_at', 'id'))
+    )
+
+
+def paginate_comments(post, page_number):
+    """A page of top-level comments of `post`, oldest first, with their replies prefetched."""
+    return Paginator(comment_threads(post), getattr(settings, 'BLOG_COMMENTS_PER_PAGE', 20)).get_page(page_number)
+
+
+async def apaginate_comments(post, page_number):
+    return await aget_page(comment_threads(post), getattr(settings, 'BLOG_COMMENTS_PER_PAGE', 20), page_number)
@@ -0,0 +1,45 @@
+"""
+Fixed-window rate limits counted in Django's cache, so every process sharing the cache shares the count.
+
+A window is `window` seconds long; the first request of a client in a window creates its counter with
+`add()`, the following ones `incr()` it, an atomic operation on the cache backends Django ships.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+RATE_KEY = 'blog:rate:{}:{}:{}'
+
+
+def rate_cache():
+    return caches[getattr(settings, 'BLOG_RATE_LIMIT_CACHE', 'default')]
+
+
+def client_key(request):
+    """Who a request counts against: the user when logged in, otherwise the client address."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def hit(scope, key, limit, window):
+    """Count one `scope` request of `key`, allowed `limit` times per `window` seconds. Returns the seconds to wait, 0 if allowed."""
+    now = int(time.time())
+    start = now - now % window
+    cache_key = RATE_KEY.format(scope, key, start)
+    cache = rate_cache()
+    cache.add(cache_key, 0, window)
+    try:
+        count = cache.incr(cache_key)
+    except ValueError:  # Expired between add() and incr()
+        cache.set(cache_key, 1, window)
+        count = 1
+    return 0 if count <= limit else start + window - now
+
+
+def comment_retry_after(request):
+    return hit(
+        'comment', client_key(request),
+        getattr(settings, 'BLOG_COMMENT_RATE_LIMIT', 5), getattr(settings, 'BLOG_COMMENT_RATE_WINDOW', 60),
+    )
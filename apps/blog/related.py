@@ -0,0 +1,108 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Post, RelatedPost
+
+# A shared tag says more about a post than a shared (broad) category
+TAG_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.0
+
+
+def stored_limit():
+    return getattr(settings, 'BLOG_RELATED_POSTS_STORED', 20)
+
+
+def related_scores(post_id):
+    """Co-occurrence scores of every post sharing a tag or a category with `post_id`."""
+    scores = Counter()
+    for through, column, weight in (
+        (Post.tags.through, 'tag_id', TAG_WEIGHT),
+        (Post.categories.through, 'category_id', CATEGORY_WEIGHT),
+    ):
+        shared = through.objects.filter(**{
+            f'{column}__in': through.objects.filter(post_id=post_id).values(column),
+        }).exclude(post_id=post_id)
+        for other_id, count in shared.values('post_id').annotate(count=Count('pk')).values_list('post_id', 'count'):
+            scores[other_id] += weight * count
+    return scores
+
+
+def top_scores(scores):
+    return heapq.nlargest(stored_limit(), scores.items(), key=lambda item: (item[1], item[0]))
+
+
+@transaction.atomic
+def update_related_posts(post_id, mirror=True):
+    """
+    Recompute the stored related posts of `post_id`.
+
+    Scores are symmetric, so with `mirror` the rows pointing back at `post_id` from other posts are
+    updated too; each post keeps at most `BLOG_RELATED_POSTS_STORED` rows.
+    """
+    scores = related_scores(post_id)
+    top = top_scores(scores)
+
+    RelatedPost.objects.filter(post_id=post_id).delete()
+    RelatedPost.objects.bulk_create(
+        [RelatedPost(post_id=post_id, related_id=other_id, score=score) for other_id, score in top]
+    )
+    if not mirror:
+        return
+
+    RelatedPost.objects.filter(related_id=post_id).exclude(post_id__in=list(scores)).delete()
+    reverse_rows = list(RelatedPost.objects.filter(related_id=post_id))
+    for row in reverse_rows:
+        row.score = scores[row.post_id]
+    RelatedPost.objects.bulk_update(reverse_rows, ['score'])
+
+    # Every neighbour may now rank `post_id` above its weakest stored entry, whether or not it is
+    # in `post_id`'s own top list
+    existing = {row.post_id for row in reverse_rows}
+    candidates = [other_id for other_id in scores if other_id not in existing]
+    stored = defaultdict(list)
+    for row in RelatedPost.objects.filter(post_id__in=candidates).only('pk', 'post_id', 'related_id', 'score'):
+        stored[row.post_id].append(row)
+    added, dropped = [], []
+    for other_id in candidates:
+        rows = stored[other_id]
+        if len(rows) >= stored_limit():
+            # Same order as related_entries(): by score, then by the newer post
+            weakest = min(rows, key=lambda row: (row.score, row.related_id))
+            if (scores[other_id], post_id) <= (weakest.score, weakest.related_id):
+                continue
+            dropped.append(weakest.pk)  # Keep the list bounded; the weakest entry falls off
+        added.append(other_id)
+    RelatedPost.objects.filter(pk__in=dropped).delete()
+    RelatedPost.objects.bulk_create(
+        [RelatedPost(post_id=other_id, related_id=post_id, score=scores[other_id]) for other_id in added]
+    )
+
+
+def rebuild_related_posts(batch_size=500):
+    """Recompute the whole table, one post at a time. Returns the number of posts processed."""
+    count = 0
+    for post_id in Post.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        update_related_posts(post_id, mirror=False)
+        count += 1
+    return count
+
+
+def related_entries(post, limit):
+    return (
+        RelatedPost.objects.filter(post=post, related__status=Post.Status.PUBLISHED)
+        .select_related('related')
+        .order_by('-score', '-related_id')[:limit]
+    )
+
+
+def related_posts_for(post, limit=5):
+    """Published related posts of `post`, best match first, in one indexed query."""
+    return [entry.related for entry in related_entries(post, limit)]
+
+
+async def arelated_posts_for(post, limit=5):
+    return [entry.related async for entry in related_entries(post, limit)]
@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain
+
+import markdown
+from django.conf import settings
+from django.core.cache import caches
+
+# Default markdown extensions with more advanced features
+DEFAULT_EXTENSIONS = [
+    "extra",  # Adds extra features (e.g., abbreviation support, footnotes, etc.)
+    "nl2br",  # Converts newlines to <br> tags
+    "tables",  # Enables table support in markdown
+    "codehilite",  # Adds syntax highlighting for code blocks
+    "admonition",  # Provides support for block quotes like notes, warnings, etc.
+    "footnotes",  # Allows usage of footnotes
+    # "strikethrough",  # Adds support for strikethrough syntax
+    # "pymdownx.emoji",  # Support for emoji shortcuts like :smile:
+    # "pymdownx.highlight",  # Custom syntax highlighting for fenced code blocks
+    # "pymdownx.superfences",  # Enhanced support for fenced code blocks and tables
+    "toc",  # Automatically generates a table of contents
+    # For math rendering (requires MathJax)
+    # "markdown_math",  # Optional: For rendering LaTeX-style math
+]
+
+# Bumped when what Post.set_rendered() derives from the HTML (excerpt, word count) changes
+DERIVED_FIELDS_REVISION = 3
+
+# Changes whenever the Markdown library or the extension set changes, so
+# stored HTML rendered by an older setup can be found and re-rendered.
+RENDERER_VERSION = hashlib.sha1(
+    f"{markdown.__version__}:{','.join(DEFAULT_EXTENSIONS)}:{DERIVED_FIELDS_REVISION}".encode()
+).hexdigest()[:12]
+
+RenderedDocument = namedtuple("RenderedDocument", ["html", "toc", "toc_tokens"])
+CacheInfo = namedtuple("CacheInfo", ["hits", "shared_hits", "misses", "maxsize", "currsize"])
+
+# Prebuilt Markdown instances kept per extension set (loading extensions is the expensive part)
+MAX_POOLED_INSTANCES = 8
+
+
+def content_digest(text):
+    """Return the hex digest used to detect content changes."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class MarkdownPool:
+    """Hands out prebuilt `markdown.Markdown` instances, calling `reset()` before reusing them."""
+
+    def __init__(self, max_instances=MAX_POOLED_INSTANCES):
+        self.max_instances = max_instances
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, extensions):
+        with self._lock:
+            instances = self._instances.get(extensions)
+            if instances:
+                return instances.pop()
+        return markdown.Markdown(extensions=list(extensions))
+
+    def release(self, extensions, md):
+        md.reset()
+        with self._lock:
+            instances = self._instances.setdefault(extensions, [])
+            if len(instances) < self.max_instances:
+                instances.append(md)
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+
+
+class RenderCache:
+    """Bounded per-process LRU of rendered HTML, with Django's cache framework as a shared second level."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = 0
+
+    @property
+    def maxsize(self):
+        return getattr(settings, "MARKDOWN_CACHE_SIZE", 512)
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, "MARKDOWN_CACHE_ALIAS", "default")]
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        html = self.shared.get(key)
+        with self._lock:
+            if html is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._store(key, html)
+        return html
+
+    def set(self, key, html):
+        self._store(key, html)
+        self.shared.set(key, html, getattr(settings, "MARKDOWN_CACHE_TIMEOUT", 60 * 60 * 24))
+
+    def _store(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.shared_hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+
+pool = MarkdownPool()
+render_cache = RenderCache()
+
+
+def toc_outline(tokens):
+    """The headings of `toc` extension tokens: level, anchor id, escaped name and children."""
+    return [
+        {"level": token["level"], "id": token["id"], "name": token["name"], "children": toc_outline(token["children"])}
+        for token in tokens
+    ]
+
+
+def _convert(text, extensions):
+    md = pool.acquire(extensions)
+    try:
+        html = md.convert(text or "")
+        tokens = toc_outline(getattr(md, "toc_tokens", []))
+        return RenderedDocument(html=html, toc=getattr(md, "toc", ""), toc_tokens=tokens)
+    finally:
+        pool.release(extensions, md)
+
+
+def render_document(text):
+    """
+    Render Markdown text with the default extensions.
+
+    Returns:
+        RenderedDocument: The rendered HTML, and the table of contents produced by the `toc` extension
+        as HTML and as a tree of headings.
+    """
+    return _convert(text, tuple(DEFAULT_EXTENSIONS))
+
+
+def render_markdown(text, extensions=None):
+    """
+    Render Markdown text to HTML through the render cache.
+
+    The cache key is a digest of the text and of the extension set, so the same text rendered with
+    different extensions never collides.
+    """
+    extensions = tuple(extensions or DEFAULT_EXTENSIONS)
+    extensions_digest = hashlib.sha1(f"{markdown.__version__}:{','.join(extensions)}".encode()).hexdigest()[:12]
+    key = f"markdown:{content_digest(text)}:{extensions_digest}"
+    html = render_cache.get(key)
+    if html is None:
+        html = _convert(text, extensions).html
+        render_cache.set(key, html)
+    return html
+
+
+_render_executor = None
+
+
+def render_executor():
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "MARKDOWN_RENDER_THREADS", 4), thread_name_prefix="markdown"
+        )
+    return _render_executor
+
+
+async def run_in_render_pool(func, *args):
+    """
+    Run a rendering function from async code on the bounded Markdown thread pool.
+
+    Rendering is CPU bound: on the event loop it would stall every other request, and on asgiref's
+    per-request threads a burst of stale posts could render on as many threads at once.
+    """
+    return await asyncio.get_running_loop().run_in_executor(render_executor(), func, *args)
+
+
+def _warm_worker():
+    # Runs once in each rendering process: load the extensions before the first text arrives
+    extensions = tuple(DEFAULT_EXTENSIONS)
+    pool.release(extensions, markdown.Markdown(extensions=list(extensions)))
+
+
+def _render_chunk(texts):
+    return [render_document(text) for text in texts]
+
+
+class RenderService:
+    """
+    Renders batches of Markdown with the default extensions across worker processes.
+
+    Markdown with codehilite is CPU bound and threads serialize on the GIL; processes scale with the
+    cores. Each worker keeps warm `Markdown` instances for its lifetime, and texts travel in chunks
+    to amortize the pickling. With one process (`MARKDOWN_RENDER_PROCESSES = 1`) rendering happens
+    inline. Use as a context manager, so the workers are shut down::
+
+        with RenderService() as service:
+            documents = service.render(texts)
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or getattr(settings, "MARKDOWN_RENDER_PROCESSES", None) or os.cpu_count() or 1
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_warm_worker)
+        return self._executor
+
+    def submit(self, texts):
+        """Start rendering `texts`; returns an iterator of their `RenderedDocument`s, in order."""
+        texts = list(texts)
+        if self.processes == 1 or len(texts) < 2:
+            return map(render_document, texts)
+        size = max(1, -(-len(texts) // (self.processes * 4)))  # About four chunks per worker
+        futures = [self.executor.submit(_render_chunk, texts[start:start + size]) for start in range(0, len(texts), size)]
+        return chain.from_iterable(future.result() for future in futures)
+
+    def render(self, texts):
+        """The `RenderedDocument`s of `texts`, in order."""
+        return list(self.submit(texts))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def cache_info():
+    """Hit/miss counters of the Markdown render cache for this process."""
+    return render_cache.info()
+
+
+def cache_clear():
+    render_cache.clear()
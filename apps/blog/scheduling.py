@@ -0,0 +1,37 @@
+import logging
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Sent with `post_ids` after scheduled posts were flipped to published in bulk (no post_save is sent)
+posts_published = Signal()
+
+
+def publish_due_posts(batch_size=500):
+    """
+    Flip scheduled posts whose `published_at` has passed to published, in batches.
+
+    Returns the number of posts published.
+    """
+    published = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            post_ids = list(
+                Post.objects.filter(status=Post.Status.SCHEDULED, published_at__lte=now)
+                .order_by('published_at', 'pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not post_ids:
+                break
+            # updated_at moves too, so conditional-GET validators see the change
+            Post.objects.filter(pk__in=post_ids).update(status=Post.Status.PUBLISHED, updated_at=now)
+            posts_published.send(sender=Post, post_ids=post_ids)
+        published += len(post_ids)
+        logger.info("Published %d scheduled post(s)", len(post_ids))
+    return published
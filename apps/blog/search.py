@@ -0,0 +1,136 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post, Tag
+
+# SQLite: FTS5 table keyed by post id (rowid), kept in sync by apps/blog/signals.py
+FTS_TABLE = 'blog_post_fts'
+
+# PostgreSQL: must stay identical to the GIN expression index created in migration 0007
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce({table}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({table}content, '')), 'B')"
+)
+
+# Snippet highlight markers, turned into <mark> after the snippet has been escaped
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+MAX_TERMS = 10
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def fts_match_expression(terms):
+    """All terms must match; the last one as a prefix so results follow the user's typing."""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_posts(query):
+    """
+    Published posts matching `query` in their title, content or tags, best match first.
+
+    Each post is annotated with `search_rank` and a `search_snippet` of the matching content.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return Post.objects.none()
+    if connection.vendor == 'postgresql':
+        return _search_postgres(terms)
+    return _search_sqlite(terms)
+
+
+def _search_sqlite(terms):
+    match = fts_match_expression(terms)
+    table = Post._meta.db_table
+    return Post.objects.published().filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]),
+    ).annotate(
+        # bm25() is lower for better matches; the title and tags columns weigh more than the content
+        search_rank=RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0, 5.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [match], output_field=FloatField(),
+        ),
+        search_snippet=RawSQL(
+            f"SELECT snippet({FTS_TABLE}, 1, %s, %s, '…', 32) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [HIGHLIGHT_START, HIGHLIGHT_END, match], output_field=TextField(),
+        ),
+    ).order_by('-search_rank', '-published_at', '-id')
+
+
+def _search_postgres(terms):
+    tsquery = ' & '.join(terms) + ':*'
+    document = PG_DOCUMENT.format(table=f'{Post._meta.db_table}.')
+    tagged = Tag.posts.through.objects.filter(tag__name__iregex=r'^(' + '|'.join(terms) + r')$').values('post_id')
+    return Post.objects.published().filter(
+        Q(id__in=RawSQL(f"SELECT id FROM {Post._meta.db_table} WHERE ({document}) @@ to_tsquery('english', %s)", [tsquery]))
+        | Q(id__in=tagged)
+    ).annotate(
+        search_rank=RawSQL(f"ts_rank({document}, to_tsquery('english', %s))", [tsquery], output_field=FloatField()),
+        search_snippet=RawSQL(
+            f"ts_headline('english', {Post._meta.db_table}.content, to_tsquery('english', %s), %s)",
+            [tsquery, f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=32, MinWords=12'],
+            output_field=TextField(),
+        ),
+    ).order_by('-search_rank', '-published_at', '-id')
+
+
+def highlight(snippet):
+    """Escape a search snippet and wrap the matched terms in <mark>."""
+    html = escape(snippet or '')
+    return mark_safe(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+def index_posts(post_ids):
+    """(Re)index the given posts in the SQLite FTS table; PostgreSQL indexes the columns directly."""
+    if connection.vendor != 'sqlite' or not post_ids:
+        return
+    post_ids = list(post_ids)
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", post_ids)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, content, tags) "
+            f"SELECT p.id, p.title, p.content, "
+            f"(SELECT group_concat(t.name, ' ') FROM blog_tag t JOIN blog_tag_posts tp ON tp.tag_id = t.id "
+            f"WHERE tp.post_id = p.id) "
+            f"FROM blog_post p WHERE p.id IN ({placeholders})",
+            post_ids,
+        )
+
+
+def unindex_posts(post_ids):
+    if connection.vendor != 'sqlite' or not post_ids:
+        return
+    post_ids = list(post_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(post_ids))})", post_ids)
+
+
+def rebuild_search_index(batch_size=500):
+    """Re-index every post. Returns the number of posts indexed."""
+    if connection.vendor != 'sqlite':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    count = 0
+    ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for post_id in ids.iterator(chunk_size=batch_size):
+        batch.append(post_id)
+        if len(batch) >= batch_size:
+            index_posts(batch)
+            count += len(batch)
+            batch = []
+    index_posts(batch)
+    return count + len(batch)
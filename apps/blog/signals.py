@@ -0,0 +1,215 @@
+from django.db.models import F, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.images import schedule_derivatives
+from core.sitemaps import schedule_refresh as schedule_sitemap_refresh
+
+from .cache import LISTING_SCOPE, bump_scopes, category_scope, post_scope, tag_scope
+from .counters import adjust_post_counts, crossed_zero, posts_became_visible
+from .models import BlogImage, Category, Comment, Post, Tag
+from .related import update_related_posts
+from .scheduling import posts_published
+from .search import index_posts, unindex_posts
+
+SCOPES = {Post: post_scope, Category: category_scope, Tag: tag_scope}
+
+
+def scopes_for(model, pks):
+    """Page cache scopes of the `model` rows with the given primary keys."""
+    if not pks:
+        return []
+    return [SCOPES[model](slug) for slug in model.objects.filter(pk__in=pks).values_list('slug', flat=True)]
+
+
+def post_page_scopes(post):
+    """The post's own pages plus every listing it appears on."""
+    return [
+        LISTING_SCOPE,
+        post_scope(post.slug),
+        *(category_scope(slug) for slug in post.categories.values_list('slug', flat=True)),
+        *(tag_scope(slug) for slug in post.tags.values_list('slug', flat=True)),
+    ]
+
+
+def posts_page_scopes(post_ids):
+    """`post_page_scopes()` of several posts at once, for bulk updates that send no signals."""
+    categories = Category.objects.filter(posts__in=post_ids).values_list('slug', flat=True).distinct()
+    tags = Tag.objects.filter(posts__in=post_ids).values_list('slug', flat=True).distinct()
+    return [
+        LISTING_SCOPE,
+        *scopes_for(Post, post_ids),
+        *(category_scope(slug) for slug in categories),
+        *(tag_scope(slug) for slug in tags),
+    ]
+
+
+def referring_scopes(post_ids):
+    """Page cache scopes of the posts that list any of `post_ids` among their related posts."""
+    slugs = Post.objects.filter(related_entries__related__in=post_ids).values_list('slug', flat=True).distinct()
+    return [post_scope(slug) for slug in slugs]
+
+
+@receiver(pre_save, sender=Post)
+def post_presave(sender, instance, **kwargs):
+    # Status is derived in save(), so compare with what the table holds to catch publish/unpublish
+    instance._was_published = bool(instance.pk) and Post.objects.filter(
+        pk=instance.pk, status=Post.Status.PUBLISHED
+    ).exists()
+
+
+@receiver(post_save, sender=Post)
+def post_postsave(sender, instance, **kwargs):
+    if instance.is_published != instance._was_published:
+        posts_became_visible([instance.pk], 1 if instance.is_published else -1)
+    if instance.is_published or instance._was_published:
+        schedule_sitemap_refresh()
+    index_posts([instance.pk])
+    # A renamed post's old URL now redirects; its cached pages must go
+    bump_scopes(*post_page_scopes(instance), post_scope(instance._previous_slug) if instance._previous_slug else None)
+    if instance.is_published != instance._was_published or instance._previous_slug:
+        # Other posts link to it from their related posts
+        bump_scopes(*referring_scopes([instance.pk]))
+    schedule_derivatives(instance.image)
+
+
+@receiver(post_save, sender=BlogImage)
+def blogimage_postsave(sender, instance, **kwargs):
+    schedule_derivatives(instance.image)
+
+
+@receiver(pre_delete, sender=Post)
+def post_predelete(sender, instance, **kwargs):
+    # Categories and tags are gone by post_delete, and the cascade sends no m2m_changed
+    if instance.is_published:
+        posts_became_visible([instance.pk], -1)
+        schedule_sitemap_refresh()
+        bump_scopes(*referring_scopes([instance.pk]))  # Before the cascade drops the related rows
+    bump_scopes(*post_page_scopes(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_postdelete(sender, instance, **kwargs):
+    unindex_posts([instance.pk])
+
+
+@receiver(posts_published, sender=Post)
+def scheduled_posts_published(sender, post_ids, **kwargs):
+    posts_became_visible(post_ids)
+    schedule_sitemap_refresh()
+    # Bulk flip: purge the pages of exactly these posts and of the listings they join
+    bump_scopes(*posts_page_scopes(post_ids), *referring_scopes(post_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def taxonomy_changed(sender, instance, **kwargs):
+    # Listings show category and tag names in the sidebar
+    bump_scopes(LISTING_SCOPE, SCOPES[sender](instance.slug))
+    if instance.post_count:
+        schedule_sitemap_refresh()  # Listed in the sitemaps, maybe under another slug now or no more
+
+
+@receiver(post_save, sender=Tag)
+def tag_postsave(sender, instance, created, **kwargs):
+    if not created:
+        index_posts(instance.posts.values_list('pk', flat=True))  # Tag names are part of the search document
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_predelete(sender, instance, **kwargs):
+    # The cascade drops the links without m2m_changed; the posts are re-indexed once they are gone
+    instance._tagged_post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_postdelete(sender, instance, **kwargs):
+    index_posts(instance._tagged_post_ids)
+
+
+def deleted_with_post(origin):
+    """Whether a deletion started at `origin` removes comments along with their post."""
+    # Comments are only deleted directly or by cascade from a parent comment, or from their post
+    # (itself maybe deleted with its author)
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin is not None and model is not Comment
+
+
+@receiver(post_save, sender=Comment)
+def comment_postsave(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1, comments_updated_at=timezone.now()
+        )
+    else:
+        Post.objects.filter(pk=instance.post_id).update(comments_updated_at=timezone.now())
+    bump_scopes(*scopes_for(Post, [instance.post_id]))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_postdelete(sender, instance, origin=None, **kwargs):
+    # Also sent for each reply removed by the cascade, inside the delete transaction
+    if deleted_with_post(origin):
+        return  # The post goes too, and post_predelete bumped its scopes
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1, comments_updated_at=timezone.now()
+    )
+    bump_scopes(*scopes_for(Post, [instance.post_id]))
+
+
+def related_pks(sender, instance, model, among=None):
+    """Primary keys of the `model` rows currently linked to `instance` through `sender`, optionally only `among` some."""
+    instance_column = 'post_id' if isinstance(instance, Post) else f'{instance._meta.model_name}_id'
+    model_column = 'post_id' if model is Post else f'{model._meta.model_name}_id'
+    links = sender.objects.filter(**{instance_column: instance.pk})
+    if among is not None:
+        links = links.filter(**{f'{model_column}__in': among})
+    return list(links.values_list(model_column, flat=True))
+
+
+def count_published_links(instance, model, pks, delta):
+    """
+    Move the post counters for links between `instance` and the `model` rows `pks` that were added
+    or removed. Returns whether a category or tag gained its first published post or lost its last.
+    """
+    if isinstance(instance, Post):
+        if not instance.is_published:
+            return False
+        taxonomy, deltas = model, {pk: delta for pk in pks}
+    else:
+        published = Post.objects.published().filter(pk__in=pks).count()
+        taxonomy, deltas = type(instance), {instance.pk: published * delta}
+    adjust_post_counts(taxonomy, deltas)
+    return crossed_zero(taxonomy, deltas)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Post.categories.through)
+def post_taxonomy_changed(sender, instance, action, model, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Remember what is linked before the rows are gone, for post_clear
+        instance._cleared_pks = related_pks(sender, instance, model)
+        return
+    if action == 'pre_remove':
+        # pk_set may name rows that were never linked; only the linked ones change anything
+        instance._removed_pks = related_pks(sender, instance, model, among=pk_set)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if action == 'post_add':
+        pks = list(pk_set or [])  # Already stripped of existing links by Django
+    else:
+        pks = instance._cleared_pks if action == 'post_clear' else instance._removed_pks
+    if count_published_links(instance, model, pks, 1 if action == 'post_add' else -1):
+        schedule_sitemap_refresh()  # Categories and tags are listed while they have published posts
+    post_ids = [instance.pk] if isinstance(instance, Post) else pks
+    for post_id in post_ids:
+        update_related_posts(post_id)
+    if sender is Post.tags.through:
+        index_posts(post_ids)  # Tag names are part of the search document
+
+    bump_scopes(LISTING_SCOPE, SCOPES[type(instance)](instance.slug), *scopes_for(model, pks))
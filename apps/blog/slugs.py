@@ -0,0 +1,101 @@
+"""
+Unique slugs without save-time IntegrityErrors or one exists() query per attempt.
+
+A title slugifies to a base (``hello-world``); when it is taken, the next free slug is the highest
+numbered ``hello-world-N`` plus one. Every slug that could collide sorts between ``hello-world-`` and
+``hello-world-:`` (``:`` follows the digits), so one range scan of the unique slug index finds them
+all. That holds in byte order (SQLite's BINARY collation); PostgreSQL's locale collations ignore
+punctuation, so there the scan is a prefix match instead, served by the ``varchar_pattern_ops``
+index Django adds to slug fields. Models may define `retired_slugs()`, a queryset of slugs not to hand out again, such as the old
+slugs that still redirect to a post.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Kept free at the end of long slugs for a "-N" suffix
+SUFFIX_ROOM = 6
+
+
+def slug_stems(model, text):
+    """The slug `text` would like (`base`) and what numbered suffixes go after (`stem`)."""
+    max_length = model._meta.get_field('slug').max_length
+    fallback = model._meta.model_name
+    base = slugify(text)[:max_length].strip('-') or fallback
+    stem = base[:max_length - SUFFIX_ROOM].strip('-') or fallback
+    return base, stem
+
+
+def colliding(base, stem):
+    if connection.vendor == 'postgresql':
+        return Q(slug=base) | Q(slug__startswith=f'{stem}-')
+    return Q(slug=base) | Q(slug__range=(f'{stem}-', f'{stem}-:'))
+
+
+def taken_slugs(model, stems, exclude_pk=None):
+    """The slugs in use that any of the (base, stem) pairs could collide with, in one query."""
+    query = reduce(or_, (colliding(base, stem) for base, stem in stems))
+    slugs = model.objects.filter(query).exclude(pk=exclude_pk).order_by().values_list('slug', flat=True)
+    retired = getattr(model, 'retired_slugs', None)
+    if retired is not None:
+        slugs = slugs.union(retired(exclude_pk).filter(query).order_by().values_list('slug', flat=True))
+    return set(slugs)
+
+
+def next_free(base, stem, taken):
+    if base not in taken:
+        return base
+    numbered = re.compile(rf'^{re.escape(stem)}-(\d+)$')
+    used = [int(match.group(1)) for slug in taken if (match := numbered.match(slug))]
+    return f'{stem}-{max(used, default=1) + 1}'
+
+
+def derived_from(model, text, slug):
+    """Whether `slug` is one the allocator would give `text`, rather than one set by hand."""
+    base, stem = slug_stems(model, text)
+    return slug == base or re.fullmatch(rf'{re.escape(stem)}-\d+', slug) is not None
+
+
+def allocate_slug(model, text, exclude_pk=None):
+    """A free slug for a `model` row titled `text`; `exclude_pk` is the row being saved."""
+    base, stem = slug_stems(model, text)
+    return next_free(base, stem, taken_slugs(model, [(base, stem)], exclude_pk))
+
+
+def save_retrying_slug(instance, text, save):
+    """
+    Run `save()` in a savepoint. When a concurrent save took the slug just allocated for `text`
+    between the allocation and the write, allocate again and save once more.
+    """
+    try:
+        with transaction.atomic():
+            return save()
+    except IntegrityError:
+        model = type(instance)
+        if not model.objects.filter(slug=instance.slug).exclude(pk=instance.pk).exists():
+            raise  # Another constraint
+        instance.slug = allocate_slug(model, text, instance.pk)
+        with transaction.atomic():
+            return save()
+
+
+def allocate_slugs(model, texts, batch_size=500, reserved=()):
+    """
+    Free slugs for new `model` rows titled `texts`, distinct among themselves: one query per batch.
+
+    `reserved` slugs are treated as taken, such as slugs other rows of the same write will use.
+    """
+    slugs = []
+    texts = list(texts)
+    for start in range(0, len(texts), batch_size):
+        stems = [slug_stems(model, text) for text in texts[start:start + batch_size]]
+        taken = taken_slugs(model, set(stems)) | set(reserved)
+        for base, stem in stems:
+            slug = next_free(base, stem, taken)
+            taken.add(slug)
+            slugs.append(slug)
+    return slugs
@@ -0,0 +1,23 @@
+from apps.tasks.queue import task
+
+from .cache import bump_scopes
+from .models import Post
+from .rendering import RenderService
+from .signals import posts_page_scopes
+
+
+@task
+def rerender_posts(post_ids, force=True):
+    """
+    Re-render the stored HTML of the given posts, and expire their pages.
+
+    Rendered inline in the worker thread: a process pool forked per task would discard its warm
+    Markdown instances after every batch. Scale with `runworker --processes` instead.
+    """
+    posts = Post.objects.filter(pk__in=post_ids)
+    if not force:
+        stale = posts.only('id', 'content', *Post.RENDER_FIELDS)
+        posts = Post.objects.filter(pk__in=[post.pk for post in stale if post.needs_render])
+    count = posts.rerender(service=RenderService(processes=1))
+    bump_scopes(*posts_page_scopes(post_ids))  # Bulk updates skip the signals
+    return count
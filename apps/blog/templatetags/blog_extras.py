@@ -0,0 +1,38 @@
+from django import template
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from apps.blog.cache import LISTING_SCOPE, page_cache, scope_versions
+from apps.blog.counters import top_by_posts
+from apps.blog.models import Category, Tag
+from apps.blog.search import highlight
+
+register = template.Library()
+
+SIDEBAR_KEY = 'blog:sidebar:{}:{}'
+
+
+@register.filter(name="highlight_snippet")
+def highlight_snippet(value):
+    """Render a search snippet with its matched terms wrapped in <mark>."""
+    return highlight(value)
+
+
+@register.simple_tag
+def taxonomy_sidebar(limit=None):
+    """
+    The top categories and tags by published posts, rendered once per version of the post list.
+
+    Every change that moves a counter also bumps the listing scope, so the fragment is never stale.
+    """
+    limit = limit or getattr(settings, 'BLOG_SIDEBAR_SIZE', 10)
+    key = SIDEBAR_KEY.format(limit, scope_versions([LISTING_SCOPE])[0])
+    html = page_cache().get(key)
+    if html is None:
+        html = render_to_string('blog/partials/sidebar.html', {
+            'categories': top_by_posts(Category, limit),
+            'tags': top_by_posts(Tag, limit),
+        })
+        page_cache().set(key, html, getattr(settings, 'BLOG_SIDEBAR_TIMEOUT', 3600))
+    return mark_safe(html)
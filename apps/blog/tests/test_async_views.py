@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from apps.blog import async_views, urls as blog_urls
+from apps.blog.models import Category, Post, Tag
+from core import urls as core_urls
+
+# The project's URLs with the async read views, as routed under core/asgi.py
+blog_patterns = [
+    path(str(pattern.pattern), getattr(async_views, pattern.name, pattern.callback), name=pattern.name)
+    for pattern in blog_urls.urlpatterns
+]
+urlpatterns = [
+    pattern for pattern in core_urls.urlpatterns if getattr(pattern, 'namespace', None) != 'blog'
+] + [path('blog/', include((blog_patterns, 'blog')))]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class BlogAsyncViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.category = Category.objects.create(name="Django", slug="django")
+        self.tag = Tag.objects.create(name="async", slug="async")
+        self.post = Post.objects.create(
+            title="Async Post", author=self.user, content="Some **bold** text.", published_at=timezone.now()
+        )
+        self.post.categories.add(self.category)
+        self.post.tags.add(self.tag)
+        self.url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+
+    async def test_listings_are_served_by_async_views(self):
+        for url in (
+            reverse('blog:post_list'),
+            reverse('blog:post_list') + '?q=bold',
+            reverse('blog:post_list_by_category', kwargs={'slug': 'django'}),
+            reverse('blog:post_list_by_tag', kwargs={'slug': 'async'}),
+        ):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, "Async Post")
+
+    async def test_post_detail_renders_stale_posts_off_the_event_loop(self):
+        await Post.objects.filter(pk=self.post.pk).aupdate(content_html="", render_version="old")
+
+        response = await self.async_client.get(self.url)
+        self.assertContains(response, "<strong>bold</strong>")
+        stored = await Post.objects.aget(pk=self.post.pk)
+        self.assertIn("<strong>bold</strong>", stored.content_html)
+
+    async def test_post_detail_answers_conditional_gets(self):
+        response = await self.async_client.get(self.url)
+        self.assertIn('Cookie', response['Vary'])
+
+        cached = await self.async_client.get(self.url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+        missing = await self.async_client.get(reverse('blog:post_detail', kwargs={'slug': 'missing'}))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_comments_are_posted_through_the_sync_view(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, {'content': "From the async route"})
+        self.assertRedirects(response, self.url)
+        self.assertEqual(self.post.comments.get().content, "From the async route")
+
+    @override_settings(BLOG_PAGE_CACHE=True)
+    async def test_anonymous_pages_are_cached(self):
+        url = reverse('blog:post_list')
+        await self.async_client.get(url)
+        await Post.objects.filter(pk=self.post.pk).aupdate(title="Changed behind the cache")
+
+        response = await self.async_client.get(url)
+        self.assertContains(response, "Async Post")
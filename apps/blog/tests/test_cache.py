@@ -0,0 +1,133 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.models import Comment, Post, Tag
+from apps.blog.rendering import content_digest
+from apps.blog.scheduling import publish_due_posts
+
+
+@pytest.fixture(autouse=True)
+def page_cache(settings):
+    settings.BLOG_PAGE_CACHE = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username="testuser", password="password")
+
+
+def publish(user, title):
+    return Post.objects.create(title=title, author=user, content="Content", published_at=timezone.now())
+
+
+def query_count(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_anonymous_pages_are_served_from_cache(client, user):
+    post = publish(user, "Cached")
+    url = reverse("blog:post_detail", kwargs={"slug": post.slug})
+
+    assert query_count(client, url) > 1
+    assert query_count(client, url) == 1  # Only the conditional-GET validators
+
+
+def test_comment_purges_only_its_post(client, user):
+    first, second = publish(user, "First"), publish(user, "Second")
+    urls = [
+        reverse("blog:post_detail", kwargs={"slug": first.slug}),
+        reverse("blog:post_detail", kwargs={"slug": second.slug}),
+        reverse("blog:post_list"),
+    ]
+    for url in urls:
+        client.get(url)
+
+    Comment.objects.create(post=first, author="reader", content="Fresh comment")
+
+    assert b"Fresh comment" in client.get(urls[0]).content
+    assert query_count(client, urls[1]) == 1
+    assert query_count(client, urls[2]) == 1
+
+
+def test_tagging_purges_the_tag_listing(client, user):
+    post = publish(user, "Tagged later")
+    tag = Tag.objects.create(name="Django")
+    url = reverse("blog:post_list_by_tag", kwargs={"slug": tag.slug})
+    assert b"Tagged later" not in client.get(url).content
+
+    post.tags.add(tag)
+
+    assert b"Tagged later" in client.get(url).content
+
+
+def test_unpublish_purges_listings(client, user):
+    post = publish(user, "Going away")
+    url = reverse("blog:post_list")
+    assert b"Going away" in client.get(url).content
+
+    post.unpublish()
+
+    assert b"Going away" not in client.get(url).content
+
+
+def test_logged_in_users_bypass_the_cache(client, user):
+    post = publish(user, "Private view")
+    url = reverse("blog:post_detail", kwargs={"slug": post.slug})
+    client.force_login(user)
+    client.get(url)
+
+    assert query_count(client, url) > 2
+
+
+def test_scheduled_publication_purges_listings(client, user):
+    post = Post.objects.create(
+        title="Scheduled", author=user, content="Content", published_at=timezone.now() + timezone.timedelta(hours=1)
+    )
+    url = reverse("blog:post_list")
+    assert b"Scheduled" not in client.get(url).content
+
+    Post.objects.filter(pk=post.pk).update(published_at=timezone.now())
+    assert publish_due_posts() == 1
+
+    assert b"Scheduled" in client.get(url).content
+
+
+def test_pages_follow_their_etag_without_a_scope_bump(client, user):
+    post = publish(user, "Revalidated")
+    url = reverse("blog:post_detail", kwargs={"slug": post.slug})
+    first = client.get(url)
+
+    # A bulk update sends no signals; the validators still see the new content
+    Post.objects.filter(pk=post.pk).update(
+        content="Changed", content_html="<p>Changed</p>", content_hash=content_digest("Changed")
+    )
+    response = client.get(url)
+
+    assert response["ETag"] != first["ETag"]
+    assert b"Changed" in response.content
+
+
+def test_scopes_are_bumped_again_when_the_writer_commits(client, user, django_capture_on_commit_callbacks):
+    post = publish(user, "Committed")
+    url = reverse("blog:post_detail", kwargs={"slug": post.slug})
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        post.content = "Edited"
+        post.save()
+        client.get(url)  # Cached before the commit, possibly from the old rows
+    assert query_count(client, url) == 1
+
+    for callback in callbacks:
+        callback()
+    assert query_count(client, url) > 1
@@ -0,0 +1,117 @@
+import re
+
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from io import StringIO
+
+from apps.blog.models import Category, Post, Tag
+from apps.blog.scheduling import publish_due_posts
+
+
+def counts(model):
+    return dict(model.objects.values_list('name', 'post_count'))
+
+
+def sidebar(response):
+    """Name -> count of the sidebar entries on a rendered post list."""
+    entries = re.findall(r'>\s*([^<>]+?)\s*</a>\s*<span class="text-gray-500 text-sm">\((\d+)\)', response.content.decode())
+    return {name: int(count) for name, count in entries}
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username="testuser", password="password")
+
+
+@pytest.fixture
+def posts(user):
+    return [
+        Post.objects.create(title=f"Post {i}", author=user, content="Content", published_at=timezone.now())
+        for i in range(3)
+    ]
+
+
+def test_links_count_published_posts_from_both_sides(posts, user):
+    first, second, third = posts
+    django, python = Tag.objects.create(name="Django"), Tag.objects.create(name="Python")
+    web = Category.objects.create(name="Web")
+    draft = Post.objects.create(title="Draft", author=user, content="Content")
+
+    first.tags.add(django, python)
+    django.posts.add(second, third, draft)  # Reverse side; the draft is not counted
+    web.posts.add(first, draft)
+    assert counts(Tag) == {"Django": 3, "Python": 1}
+    assert counts(Category) == {"Web": 1}
+
+    django.posts.remove(second, draft)
+    first.tags.remove(python, python)
+    third.tags.remove(python)  # Never linked
+    assert counts(Tag) == {"Django": 2, "Python": 0}
+
+    django.posts.clear()
+    first.categories.clear()
+    assert counts(Tag) == {"Django": 0, "Python": 0}
+    assert counts(Category) == {"Web": 0}
+
+
+def test_publishing_unpublishing_and_deleting_move_the_counters(posts, user):
+    first, second, _ = posts
+    tag = Tag.objects.create(name="Django")
+    tag.posts.add(first, second)
+
+    first.unpublish()
+    assert counts(Tag) == {"Django": 1}
+    first.save()  # No transition, no change
+    assert counts(Tag) == {"Django": 1}
+    first.publish()
+    assert counts(Tag) == {"Django": 2}
+
+    second.delete()
+    assert counts(Tag) == {"Django": 1}
+    first.unpublish()
+    first.delete()
+    assert counts(Tag) == {"Django": 0}
+
+
+def test_scheduled_posts_are_counted_when_published(user):
+    post = Post.objects.create(
+        title="Later", author=user, content="Content", published_at=timezone.now() + timedelta(hours=1)
+    )
+    category = Category.objects.create(name="Web")
+    category.posts.add(post)
+    assert counts(Category) == {"Web": 0}
+
+    Post.objects.filter(pk=post.pk).update(published_at=timezone.now() - timedelta(minutes=1))
+    publish_due_posts()
+    assert counts(Category) == {"Web": 1}
+
+
+def test_recount_repairs_drifted_counters(posts, user):
+    tag = Tag.objects.create(name="Django")
+    tag.posts.add(*posts)
+    Category.objects.create(name="Empty")
+    Tag.objects.update(post_count=42)
+    Category.objects.update(post_count=7)
+
+    out = StringIO()
+    call_command('recount_posts', stdout=out)
+    assert counts(Tag) == {"Django": 3}
+    assert counts(Category) == {"Empty": 0}
+    assert "2 categories and tags" in out.getvalue()
+
+
+def test_sidebar_lists_the_top_entries_and_follows_changes(posts, client, settings):
+    settings.BLOG_SIDEBAR_SIZE = 2
+    first, second, third = posts
+    for name, tagged in (("Django", posts), ("Python", [first, second]), ("Rust", [first])):
+        Tag.objects.create(name=name).posts.add(*tagged)
+    Tag.objects.create(name="Unused")
+
+    assert sidebar(client.get(reverse('blog:post_list'))) == {"Django": 3, "Python": 2}
+
+    Tag.objects.get(name="Rust").posts.add(second, third)
+    assert sidebar(client.get(reverse('blog:post_list'))) == {"Rust": 3, "Django": 3}
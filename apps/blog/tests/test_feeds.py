@@ -0,0 +1,109 @@
+import json
+from xml.etree import ElementTree
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.models import Category, Post, Tag
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+def body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+@pytest.fixture
+def posts(db):
+    cache.clear()
+    user = User.objects.create_user(username="writer", password="password")
+    posts = [
+        Post.objects.create(
+            title=f"Post {i}", author=user, content=f"Some **bold** text {i}.", published_at=timezone.now()
+        )
+        for i in range(3)
+    ]
+    Post.objects.create(title="Draft", author=user, content="Not yet.")
+    Category.objects.create(name="Web").posts.add(posts[0], posts[1])
+    Tag.objects.create(name="Django").posts.add(posts[2])
+    return posts
+
+
+def test_rss_feed_lists_published_posts_with_their_html(client, posts):
+    response = client.get(reverse('blog:post_feed', args=['rss']))
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('application/rss+xml')
+
+    channel = ElementTree.fromstring(body(response)).find('channel')
+    items = channel.findall('item')
+    assert [item.findtext('title') for item in items] == ["Post 2", "Post 1", "Post 0"]
+    assert items[0].findtext('link') == f"http://testserver/blog/post/{posts[2].slug}/"
+    assert "<strong>bold</strong>" in items[0].findtext('description')
+    assert [category.text for category in items[0].findall('category')] == ["Django"]
+
+
+def test_atom_and_json_feeds_of_a_category_and_a_tag(client, posts):
+    atom = ElementTree.fromstring(body(client.get(reverse('blog:category_feed', args=['web', 'atom']))))
+    assert atom.findtext(f'{ATOM}title') == "Posts in Web"
+    assert [entry.findtext(f'{ATOM}title') for entry in atom.findall(f'{ATOM}entry')] == ["Post 1", "Post 0"]
+
+    feed = json.loads(body(client.get(reverse('blog:tag_feed', args=['django', 'json']))))
+    assert feed['version'] == 'https://jsonfeed.org/version/1.1'
+    assert [item['title'] for item in feed['items']] == ["Post 2"]
+    assert feed['items'][0]['tags'] == ["Django"]
+
+    assert client.get(reverse('blog:tag_feed', args=['django', 'yaml'])).status_code == 404
+    assert client.get(reverse('blog:tag_feed', args=['missing', 'rss'])).status_code == 404
+
+
+def test_feed_is_built_once_per_change(client, posts, django_assert_max_num_queries):
+    url = reverse('blog:post_feed', args=['atom'])
+    first = client.get(url)
+    assert first.streaming
+    first_body = body(first)
+
+    with django_assert_max_num_queries(1):  # The validators only
+        cached = client.get(url)
+    assert not cached.streaming
+    assert cached.content == first_body
+
+    posts[0].title = "Renamed"
+    posts[0].save()
+    assert b"Renamed" in body(client.get(url))
+
+
+def test_feed_changed_in_another_process_is_rebuilt(client, posts):
+    url = reverse('blog:post_feed', args=['rss'])
+    body(client.get(url))
+
+    # As a cron job would publish it, its scope bump landing in another process's cache
+    Post.objects.filter(pk=posts[0].pk).update(title="Published elsewhere", updated_at=timezone.now())
+
+    assert b"Published elsewhere" in body(client.get(url))
+
+
+def test_feeds_answer_conditional_gets(client, posts):
+    url = reverse('blog:post_feed', args=['rss'])
+    response = client.get(url)
+    body(response)
+    assert 'public' in response['Cache-Control']
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code == 304
+
+    posts[1].unpublish()
+    assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_feeds_stream_asynchronously_under_asgi(async_client, posts):
+    async def fetch():
+        response = await async_client.get(reverse('blog:post_feed', args=['json']))
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    feed = json.loads(async_to_sync(fetch)())
+    assert [item['title'] for item in feed['items']] == ["Post 2", "Post 1", "Post 0"]
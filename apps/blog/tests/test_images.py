@@ -0,0 +1,83 @@
+import threading
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from apps.blog.models import BlogImage
+from apps.tasks.models import Task
+from apps.tasks.worker import work
+from core import images
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_DERIVATIVE_WIDTHS = (64, 320)
+    cache.clear()
+    yield tmp_path
+    cache.clear()
+
+
+def upload(width=400, height=200, name="photo.png"):
+    buffer = BytesIO()
+    Image.new("RGBA", (width, height), (200, 10, 10, 255)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@pytest.mark.django_db
+def test_derivatives_are_generated_next_to_the_original(media_root):
+    blog_image = BlogImage.objects.create(image=upload())
+    assert blog_image.srcset == ""
+
+    images.generate_derivatives(blog_image.image.name, blog_image.image.storage)
+
+    small = Image.open(media_root / "blog_media" / "photo.png.64w.webp")
+    assert small.size == (64, 32)
+    assert Image.open(media_root / "blog_media" / "photo.png.320w.jpg").format == "JPEG"
+    assert blog_image.srcset == "/media/blog_media/photo.png.64w.webp 64w, /media/blog_media/photo.png.320w.webp 320w"
+
+
+@pytest.mark.django_db
+def test_small_originals_are_not_upscaled(media_root):
+    blog_image = BlogImage.objects.create(image=upload(width=100, height=50))
+    images.generate_derivatives(blog_image.image.name, blog_image.image.storage)
+
+    assert Image.open(media_root / "blog_media" / "photo.png.320w.webp").size == (100, 50)
+
+
+@pytest.mark.django_db
+def test_derivatives_are_generated_by_the_worker(media_root):
+    blog_image = BlogImage.objects.create(image=upload())
+    assert Task.objects.get().name == "core.images.generate_image_derivatives"
+    assert not (media_root / "blog_media" / "photo.png.320w.webp").exists()
+
+    work("test", threading.Event(), burst=True)
+
+    assert (media_root / "blog_media" / "photo.png.320w.webp").exists()
+    assert blog_image.srcset
+
+
+@pytest.mark.django_db
+def test_derivatives_are_removed_with_the_original(media_root, django_capture_on_commit_callbacks):
+    blog_image = BlogImage.objects.create(image=upload())
+    images.generate_derivatives(blog_image.image.name, blog_image.image.storage)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        blog_image.delete()
+
+    assert list((media_root / "blog_media").iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_originals_differing_by_extension_keep_their_own_derivatives(media_root):
+    png = BlogImage.objects.create(image=upload(width=100, height=50, name="photo.png"))
+    jpg = BlogImage.objects.create(image=upload(width=200, height=50, name="photo.jpg"))
+    images.generate_derivatives(png.image.name, png.image.storage)
+    images.generate_derivatives(jpg.image.name, jpg.image.storage)
+
+    assert Image.open(media_root / "blog_media" / "photo.png.320w.webp").size == (100, 50)
+    assert Image.open(media_root / "blog_media" / "photo.jpg.320w.webp").size == (200, 50)
+    assert png.srcset != jpg.srcset
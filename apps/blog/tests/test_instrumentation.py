@@ -0,0 +1,56 @@
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.models import Post
+from core.instrumentation import BudgetExceeded
+
+
+def timing(response, name):
+    match = re.search(rf'{name};dur=([\d.]+)(?:;desc="(\d+) queries")?', response['Server-Timing'])
+    return float(match.group(1)), match.group(2)
+
+
+@override_settings(INSTRUMENTATION_SERVER_TIMING=True)
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.post = Post.objects.create(
+            title="Timed Post", author=self.user, content="# Heading\n\nSome *text*.", published_at=timezone.now()
+        )
+
+    def test_server_timing_reports_the_queries_of_the_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blog:post_list'))
+
+        db_ms, count = timing(response, 'db')
+        self.assertEqual(int(count), len(queries))
+        self.assertGreater(timing(response, 'tpl')[0], 0)
+        self.assertGreaterEqual(timing(response, 'total')[0], db_ms)
+
+    def test_markdown_time_is_recorded(self):
+        Post.objects.filter(pk=self.post.pk).update(render_version="old")
+        response = self.client.get(reverse('blog:post_detail', kwargs={'slug': self.post.slug}))
+        self.assertGreater(timing(response, 'md')[0], 0)
+
+    @override_settings(ROOT_URLCONF='apps.blog.tests.test_async_views')
+    def test_async_views_are_instrumented(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blog:post_detail', kwargs={'slug': self.post.slug}))
+        self.assertEqual(int(timing(response, 'db')[1]), len(queries))
+
+    @override_settings(INSTRUMENTATION_BUDGETS={'blog:post_list': {'queries': 1}})
+    def test_views_over_budget_fail_or_warn(self):
+        with self.assertRaisesMessage(BudgetExceeded, "blog:post_list over budget: queries"):
+            self.client.get(reverse('blog:post_list'))
+
+        with self.settings(INSTRUMENTATION_BUDGET_ACTION="warn"):
+            with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+                response = self.client.get(reverse('blog:post_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("over budget", logs.output[0])
@@ -1,7 +1,20 @@
+import threading
+
 import pytest
+from django.contrib import admin
+from django.contrib.messages.storage.cookie import CookieStorage
+from io import StringIO
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models.signals import post_delete
 from django.utils import timezone
+from apps.blog.admin import PostAdmin
+from apps.blog.cache import LISTING_SCOPE, post_scope, scope_versions
 from apps.blog.models import Category, Post, Comment, Tag
+from apps.blog.rendering import RENDERER_VERSION
 from django.contrib.auth.models import User
+from apps.tasks.models import Task
+from apps.tasks.worker import work
 
 
 @pytest.mark.django_db
@@ -26,10 +39,107 @@ def test_post_markdown_rendering():
         title="Markdown Post", author=user, content="# Header\nSome **bold** text."
     )
     rendered = post.get_markdown()
-    assert "<h1>Header</h1>" in rendered
+    assert '<h1 id="header">Header</h1>' in rendered
     assert "<strong>bold</strong>" in rendered
 
 
+@pytest.mark.django_db
+def test_post_stores_rendered_markdown():
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(
+        title="Stored Post", author=user, content="## Intro\nSome *text*."
+    )
+    post.refresh_from_db()
+    assert "<em>text</em>" in post.content_html
+    assert 'href="#intro"' in post.toc_html
+    assert post.render_version == RENDERER_VERSION
+    assert post.needs_render is False
+
+    post.content = "Changed **content**"
+    post.save()
+    post.refresh_from_db()
+    assert "<strong>content</strong>" in post.content_html
+
+
+@pytest.mark.django_db
+def test_rerender_posts_command_refreshes_stale_rows():
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(title="Stale Post", author=user, content="**bold**")
+    Post.objects.filter(pk=post.pk).update(content_html="", render_version="old")
+
+    versions = scope_versions([LISTING_SCOPE, post_scope(post.slug)])
+    call_command("rerender_posts", "--processes", "1", stdout=StringIO())
+
+    post.refresh_from_db()
+    assert "<strong>bold</strong>" in post.content_html
+    assert post.render_version == RENDERER_VERSION
+    # Cached pages of the post and its listings are expired
+    assert all(a != b for a, b in zip(scope_versions([LISTING_SCOPE, post_scope(post.slug)]), versions))
+
+
+@pytest.mark.django_db
+def test_queryset_rerender_stores_html_in_batches():
+    user = User.objects.create_user(username="testuser", password="password")
+    posts = [Post.objects.create(title=f"Post {number}", author=user, content=f"*{number}*") for number in range(5)]
+    Post.objects.update(content_html="", render_version="old")
+
+    assert Post.objects.all().rerender(batch_size=2) == 5
+
+    for post in posts:
+        post.refresh_from_db()
+        assert post.content_html == f"<p><em>{post.title[5:]}</em></p>"
+        assert post.render_version == RENDERER_VERSION
+
+
+@pytest.mark.django_db
+def test_admin_rerender_action_is_queued_for_the_worker(rf):
+    user = User.objects.create_superuser(username="admin", password="password")
+    post = Post.objects.create(title="Queued", author=user, content="*fresh*")
+    Post.objects.filter(pk=post.pk).update(content_html="", render_version="old")
+    request = rf.post("/")
+    request.user = user
+    request._messages = CookieStorage(request)
+
+    PostAdmin(Post, admin.site).rerender(request, Post.objects.all())
+    post.refresh_from_db()
+    assert post.content_html == ""
+    assert Task.objects.filter(name="apps.blog.tasks.rerender_posts").count() == 1
+
+    work("test", threading.Event(), burst=True)
+    post.refresh_from_db()
+    assert post.content_html == "<p><em>fresh</em></p>"
+
+
+@pytest.mark.django_db
+def test_post_stores_reading_stats_and_toc(settings):
+    settings.BLOG_WORDS_PER_MINUTE = 10
+    user = User.objects.create_user(username="testuser", password="password")
+    words = " ".join(["word"] * 21)
+    post = Post.objects.create(title="Stats", author=user, content=f"# Intro\n\n{words}\n\n## Details & more\n\nEnd.")
+
+    post.refresh_from_db()
+    assert post.word_count == 25  # "&" is not a word
+    assert post.reading_time == 3
+    assert post.toc == [
+        {"level": 1, "id": "intro", "name": "Intro", "children": [
+            {"level": 2, "id": "details-more", "name": "Details &amp; more", "children": []},
+        ]},
+    ]
+
+
+@pytest.mark.django_db
+def test_backfill_post_stats_command_fills_missing_rows():
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(title="Old Post", author=user, content="# Heading\n\nThree more words")
+    Post.objects.filter(pk=post.pk).update(word_count=None, reading_time=None, toc=[])
+
+    call_command("backfill_post_stats", "--processes", "1", stdout=StringIO())
+
+    post.refresh_from_db()
+    assert (post.word_count, post.reading_time) == (4, 1)
+    assert post.toc[0]["id"] == "heading"
+
+
 @pytest.mark.django_db
 def test_post_is_published_property():
     user = User.objects.create_user(username="testuser", password="password")
@@ -97,3 +207,101 @@ def test_post_tag_association():
 
     assert tag in post.tags.all()
     assert post in tag.posts.all()
+
+
+@pytest.mark.django_db
+def test_post_excerpt_is_plain_text():
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(
+        title="Excerpt Post", author=user, content="# Title\n\nSome **bold** text. " + "word " * 100
+    )
+    assert post.excerpt.startswith("Title Some bold text.")
+    assert len(post.excerpt) <= Post.EXCERPT_LENGTH
+    assert post.excerpt.endswith("…")
+
+
+@pytest.mark.django_db
+def test_post_comment_count_tracks_comments_and_replies():
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(title="Counted Post", author=user, content="Content")
+    comment = Comment.objects.create(post=post, author="Commenter", content="First")
+    Comment.objects.create(post=post, parent=comment, author="Replier", content="Reply")
+    post.refresh_from_db()
+    assert post.comment_count == 2
+
+    comment.delete()  # Cascades to the reply
+    post.refresh_from_db()
+    assert post.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_deleting_a_post_skips_per_comment_bookkeeping(django_assert_max_num_queries):
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(title="Busy Post", author=user, content="Content", published_at=timezone.now())
+    for i in range(50):
+        comment = Comment.objects.create(post=post, author="reader", content=f"Comment {i}")
+        Comment.objects.create(post=post, parent=comment, author="replier", content="Reply")
+
+    with django_assert_max_num_queries(30):
+        post.delete()
+    assert not Comment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_comments_are_counted_after_a_rolled_back_post_delete():
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(title="Kept Post", author=user, content="Content", published_at=timezone.now())
+    comment = Comment.objects.create(post=post, author="reader", content="First")
+    Comment.objects.create(post=post, author="reader", content="Second")
+
+    def fail(**kwargs):
+        raise RuntimeError
+
+    # The cascade fails halfway, after the post's pre_delete
+    post_delete.connect(fail, sender=Comment)
+    try:
+        with pytest.raises(RuntimeError), transaction.atomic():
+            Post.objects.get(pk=post.pk).delete()
+    finally:
+        post_delete.disconnect(fail, sender=Comment)
+
+    comment.delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1
+
+
+@pytest.mark.django_db
+def test_post_status_follows_published_at():
+    user = User.objects.create_user(username="testuser", password="password")
+    post = Post.objects.create(title="Status Post", author=user, content="Content")
+    assert post.status == Post.Status.DRAFT
+
+    post.published_at = timezone.now() + timezone.timedelta(hours=1)
+    post.save()
+    assert post.status == Post.Status.SCHEDULED
+    assert post.is_published is False
+    assert not Post.objects.published().exists()
+
+    post.publish()
+    assert post.status == Post.Status.PUBLISHED
+    assert list(Post.objects.published()) == [post]
+
+
+@pytest.mark.django_db
+def test_publish_scheduled_posts_command_flips_due_posts():
+    user = User.objects.create_user(username="testuser", password="password")
+    due = Post.objects.create(
+        title="Due", author=user, content="Content", published_at=timezone.now() + timezone.timedelta(seconds=1)
+    )
+    later = Post.objects.create(
+        title="Later", author=user, content="Content", published_at=timezone.now() + timezone.timedelta(days=1)
+    )
+    Post.objects.filter(pk=due.pk).update(published_at=timezone.now() - timezone.timedelta(minutes=1))
+
+    out = StringIO()
+    call_command("publish_scheduled_posts", "--batch-size", "1", stdout=out)
+
+    assert "Published 1 scheduled post(s)." in out.getvalue()
+    assert list(Post.objects.published()) == [due]
+    later.refresh_from_db()
+    assert later.status == Post.Status.SCHEDULED
@@ -0,0 +1,106 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from io import StringIO
+
+from apps.blog.cache import post_scope, scope_versions
+from apps.blog.models import Category, Post, RelatedPost, Tag
+from apps.blog.related import related_posts_for
+
+
+def scores(post):
+    return dict(RelatedPost.objects.filter(post=post).values_list('related__title', 'score'))
+
+
+@pytest.fixture
+def posts(db):
+    user = User.objects.create_user(username="testuser", password="password")
+    return [
+        Post.objects.create(title=f"Post {i}", author=user, content="Content", published_at=timezone.now())
+        for i in range(3)
+    ]
+
+
+def test_shared_tags_and_categories_are_scored_both_ways(posts):
+    first, second, third = posts
+    django, python = Tag.objects.create(name="Django"), Tag.objects.create(name="Python")
+    category = Category.objects.create(name="Web")
+
+    first.tags.add(django, python)
+    second.tags.add(django, python)
+    django.posts.add(third)  # Reverse side of the relation
+    category.posts.add(first, second)
+
+    assert scores(first) == {"Post 1": 5.0, "Post 2": 2.0}
+    assert scores(second) == {"Post 0": 5.0, "Post 2": 2.0}
+    assert scores(third) == {"Post 0": 2.0, "Post 1": 2.0}
+    assert related_posts_for(first) == [second, third]
+
+
+def test_removing_tags_updates_both_sides(posts):
+    first, second, third = posts
+    tag = Tag.objects.create(name="Django")
+    tag.posts.add(first, second)
+
+    second.tags.remove(tag)
+    assert scores(first) == {}
+    assert scores(second) == {}
+
+    tag.posts.add(second, third)
+    tag.posts.clear()
+    assert not RelatedPost.objects.exists()
+
+
+def test_neighbours_outside_the_top_list_learn_about_a_better_match(posts, settings):
+    settings.BLOG_RELATED_POSTS_STORED = 1
+    a, b, c = posts
+    x, y, z = (Tag.objects.create(name=name) for name in "xyz")
+    b.tags.add(x)
+    c.tags.add(y, z)
+
+    a.tags.add(x, y, z)
+
+    assert scores(a) == {"Post 2": 4.0}
+    assert scores(b) == {"Post 0": 2.0}  # Not in A's top list, but A is B's best match
+    assert scores(c) == {"Post 0": 4.0}
+
+
+def test_related_posts_hide_unpublished_posts(posts):
+    first, second, third = posts
+    Tag.objects.create(name="Django").posts.add(first, second, third)
+    second.unpublish()
+
+    assert related_posts_for(first) == [third]
+
+
+def test_listing_posts_expire_when_a_related_post_is_hidden_or_renamed(posts):
+    first, second, third = posts
+    Tag.objects.create(name="Django").posts.add(first, second)
+
+    def listing_versions():
+        return scope_versions([post_scope(first.slug), post_scope(third.slug)])
+
+    before = listing_versions()
+    second.unpublish()
+    hidden = listing_versions()
+    assert hidden[0] != before[0] and hidden[1] == before[1]
+
+    second.publish()
+    assert listing_versions()[0] != hidden[0]
+
+    shown = listing_versions()
+    second.slug = "renamed"
+    second.save()
+    assert listing_versions()[0] != shown[0]
+
+
+def test_rebuild_related_posts_command(posts):
+    first, second, _ = posts
+    Tag.objects.create(name="Django").posts.add(first, second)
+    RelatedPost.objects.all().delete()
+
+    call_command("rebuild_related_posts", stdout=StringIO())
+
+    assert scores(first) == {"Post 1": 2.0}
+    assert scores(second) == {"Post 0": 2.0}
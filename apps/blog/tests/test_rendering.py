@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import cache
+
+from apps.blog import rendering
+from apps.blog.templatetags.markdown_extras import markdown_filter
+
+
+@pytest.fixture(autouse=True)
+def clear_render_cache():
+    cache.clear()
+    rendering.cache_clear()
+    yield
+    cache.clear()
+    rendering.cache_clear()
+
+
+def test_markdown_filter_caches_by_content():
+    first = markdown_filter("Some **bold** text.")
+    second = markdown_filter("Some **bold** text.")
+
+    assert first == second
+    assert "<strong>bold</strong>" in first
+    info = rendering.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+def test_render_cache_is_keyed_by_extension_set():
+    with_toc = rendering.render_markdown("# Title", extensions=["toc"])
+    without_toc = rendering.render_markdown("# Title", extensions=["extra"])
+
+    assert with_toc == '<h1 id="title">Title</h1>'
+    assert without_toc == "<h1>Title</h1>"
+    assert rendering.cache_info().misses == 2
+
+
+def test_render_cache_falls_back_to_shared_cache():
+    rendering.render_markdown("shared *text*")
+    rendering.render_cache._entries.clear()
+
+    assert rendering.render_markdown("shared *text*") == "<p>shared <em>text</em></p>"
+    assert rendering.cache_info().shared_hits == 1
+
+
+def test_render_cache_is_bounded(settings):
+    settings.MARKDOWN_CACHE_SIZE = 2
+    for text in ("one", "two", "three"):
+        rendering.render_markdown(text)
+
+    assert rendering.cache_info().currsize == 2
+
+
+def test_pooled_instances_are_reset_between_renders():
+    first = rendering.render_document("# First")
+    second = rendering.render_document("# Second")
+
+    assert "first" not in second.toc
+    assert 'href="#second"' in second.toc
+    assert first.html == '<h1 id="first">First</h1>'
+
+
+def test_render_service_matches_inline_rendering_in_order():
+    texts = [f"# Post {number}\n\n```python\nx = {number}\n```" for number in range(12)]
+
+    with rendering.RenderService(processes=2) as service:
+        documents = service.render(texts)
+
+    assert documents == [rendering.render_document(text) for text in texts]
+
+
+def test_render_service_with_one_process_renders_inline():
+    service = rendering.RenderService(processes=1)
+
+    assert service.render(["*one*", "*two*"])[1].html == "<p><em>two</em></p>"
+    assert service._executor is None
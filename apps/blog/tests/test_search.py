@@ -0,0 +1,76 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.models import Post, Tag
+from apps.blog.search import highlight, search_posts
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username="testuser", password="password")
+
+
+def publish(user, title, content):
+    return Post.objects.create(title=title, author=user, content=content, published_at=timezone.now())
+
+
+def titles(query):
+    return [post.title for post in search_posts(query)]
+
+
+def test_search_matches_title_content_and_tags(user):
+    publish(user, "Caching in Django", "How we cache pages.")
+    publish(user, "Templates", "Template fragments can be cached too.")
+    tagged = publish(user, "Deploying", "Gunicorn and nginx.")
+    tagged.tags.add(Tag.objects.create(name="performance"))
+    Post.objects.create(title="Draft about caching", author=user, content="cache")
+
+    assert titles("cach") == ["Caching in Django", "Templates"]
+    assert titles("performance") == ["Deploying"]
+    assert titles('"unbalanced (query') == []
+
+
+def test_search_index_follows_edits_and_deletes(user):
+    post = publish(user, "Original", "Nothing to see.")
+    post.content = "Now about migrations."
+    post.save()
+    assert titles("migrations") == ["Original"]
+
+    post.delete()
+    assert titles("migrations") == []
+
+
+def test_search_index_follows_renamed_and_deleted_tags(user):
+    tag = Tag.objects.create(name="performance")
+    tag.posts.add(publish(user, "Deploying", "Gunicorn and nginx."))
+
+    tag.name = "speed"
+    tag.save()
+    assert titles("performance") == []
+    assert titles("speed") == ["Deploying"]
+
+    tag.delete()
+    assert titles("speed") == []
+
+
+def test_search_snippet_is_escaped_and_highlighted(user):
+    publish(user, "Snippets", "Use <script> tags carefully with markdown.")
+    snippet = highlight(search_posts("markdown").get().search_snippet)
+    assert "&lt;script&gt;" in snippet
+    assert "<mark>markdown</mark>" in snippet
+
+
+def test_post_list_search_is_paginated(user, client, settings):
+    settings.BLOG_POSTS_PER_PAGE = 2
+    for i in range(3):
+        publish(user, f"Search result {i}", "Full text search with FTS5.")
+    publish(user, "Unrelated", "Nothing here.")
+
+    response = client.get(reverse("blog:post_list"), {"q": "fts5", "page": 2})
+    assert response.status_code == 200
+    assert len(response.context["posts"]) == 1
+    assert response.context["posts"].paginator.count == 3
+    assert b"<mark>FTS5</mark>" in response.content
+    assert b"q=fts5&amp;page=1" in response.content
@@ -0,0 +1,127 @@
+from xml.etree import ElementTree
+
+import threading
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from io import StringIO
+
+from apps.blog.models import Category, Post, Tag
+from apps.tasks.models import Task
+from apps.tasks.worker import work
+from core.sitemaps import refresh_sitemaps, write_sitemaps
+
+NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+def locations(path):
+    return [loc.text for loc in ElementTree.parse(path).getroot().iter(f'{NS}loc')]
+
+
+@pytest.fixture
+def site(db, settings, tmp_path):
+    settings.SITEMAP_ROOT = tmp_path
+    settings.SITEMAP_BASE_URL = "https://blog.example"
+    settings.SITEMAP_SHARD_SIZE = 2
+    user = User.objects.create_user(username="writer", password="password")
+    posts = [
+        Post.objects.create(title=f"Post {i}", author=user, content="Content", published_at=timezone.now())
+        for i in range(3)
+    ]
+    Post.objects.create(title="Draft", author=user, content="Content")
+    Category.objects.create(name="Web").posts.add(posts[0])
+    Tag.objects.create(name="Unused")
+    return tmp_path
+
+
+def test_sections_are_sharded_and_indexed(site):
+    assert write_sitemaps() == [
+        "sitemap-posts-1.xml", "sitemap-posts-2.xml", "sitemap-categories-1.xml", "sitemap-profiles-1.xml",
+    ]
+    assert locations(site / "sitemap.xml") == [
+        f"https://blog.example/{name}"
+        for name in ("sitemap-posts-1.xml", "sitemap-posts-2.xml", "sitemap-categories-1.xml", "sitemap-profiles-1.xml")
+    ]
+    assert locations(site / "sitemap-posts-1.xml") == [
+        "https://blog.example/blog/post/post-0/", "https://blog.example/blog/post/post-1/",
+    ]
+    assert locations(site / "sitemap-posts-2.xml") == ["https://blog.example/blog/post/post-2/"]
+    assert locations(site / "sitemap-categories-1.xml") == ["https://blog.example/blog/category/web/"]
+    assert locations(site / "sitemap-profiles-1.xml") == ["https://blog.example/@writer/"]
+
+
+def test_stale_shards_are_removed(site, settings):
+    write_sitemaps()
+    settings.SITEMAP_SHARD_SIZE = 50
+    out = StringIO()
+    call_command('write_sitemaps', '--base-url', 'https://other.example/', stdout=out)
+
+    assert not (site / "sitemap-posts-2.xml").exists()
+    assert locations(site / "sitemap.xml")[0] == "https://other.example/sitemap-posts-1.xml"
+    assert "Wrote 3 sitemap shard(s)" in out.getvalue()
+
+
+def test_missing_sitemaps_are_queued_and_then_served(site, client):
+    Task.objects.all().delete()
+    response = client.get("/sitemap.xml")
+    assert response.status_code == 503
+    assert response['Retry-After'] == "30"
+    assert not (site / "sitemap.xml").exists()
+    assert list(Task.objects.values_list('name', flat=True)) == [refresh_sitemaps.name]
+    assert Task.objects.get().run_at <= timezone.now()
+
+    work("test", threading.Event(), burst=True)
+    response = client.get("/sitemap.xml")
+    assert response.status_code == 200
+    assert response['Content-Type'] == "application/xml"
+    assert b"sitemap-posts-2.xml" in b"".join(response.streaming_content)
+
+    assert client.get("/sitemap-posts-2.xml", HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code == 304
+    assert client.get("/sitemap-posts-9.xml").status_code == 404
+
+
+def test_rewrites_leave_no_temporary_files(site):
+    write_sitemaps()
+    write_sitemaps()
+    assert sorted(path.name for path in site.iterdir()) == [
+        "sitemap-categories-1.xml", "sitemap-posts-1.xml", "sitemap-posts-2.xml", "sitemap-profiles-1.xml",
+        "sitemap.xml",
+    ]
+
+
+def test_publishing_queues_one_refresh(site):
+    Task.objects.all().delete()
+    post = Post.objects.get(title="Draft")
+    post.publish()
+    Post.objects.get(title="Post 0").unpublish()
+    Post.objects.get(title="Post 1").save()
+
+    assert list(Task.objects.values_list('name', flat=True)) == [refresh_sitemaps.name]
+
+
+def test_first_and_last_posts_of_a_category_queue_a_refresh(site):
+    Task.objects.all().delete()
+    tag = Tag.objects.get(name="Unused")
+    post = Post.objects.get(title="Post 1")
+    post.tags.add(tag)
+    assert Task.objects.filter(name=refresh_sitemaps.name).count() == 1
+
+    Task.objects.all().delete()
+    Category.objects.get(name="Web").posts.add(post)  # Already listed
+    assert not Task.objects.exists()
+
+    post.tags.remove(tag)
+    assert Task.objects.filter(name=refresh_sitemaps.name).count() == 1
+
+
+def test_new_profiles_queue_a_refresh(site):
+    Task.objects.all().delete()
+    user = User.objects.create_user(username="reader", password="password")
+    assert Task.objects.filter(name=refresh_sitemaps.name).count() == 1
+
+    Task.objects.all().delete()
+    user.last_login = timezone.now()
+    user.save(update_fields=["last_login"])
+    assert not Task.objects.exists()
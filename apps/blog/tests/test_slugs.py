@@ -0,0 +1,90 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog import models
+from apps.blog.models import Category, Post, SlugHistory, Tag
+from apps.blog.slugs import allocate_slug, allocate_slugs
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username="writer", password="password")
+
+
+def create_post(user, title, **kwargs):
+    return Post.objects.create(title=title, author=user, content="Content", published_at=timezone.now(), **kwargs)
+
+
+def test_duplicate_titles_and_names_get_numbered_slugs(user):
+    assert [create_post(user, "Hello World").slug for _ in range(3)] == ["hello-world", "hello-world-2", "hello-world-3"]
+    create_post(user, "Hello World Again")  # Shares the prefix, not the numbering
+    assert create_post(user, "Hello, world!").slug == "hello-world-4"
+
+    assert [Category.objects.create(name=name).slug for name in ("Web", "web!")] == ["web", "web-2"]
+    assert [Tag.objects.create(name=name).slug for name in ("C++", "C")] == ["c", "c-2"]
+    assert create_post(user, "???").slug == "post"
+
+
+def test_one_query_finds_the_next_suffix(user, django_assert_num_queries):
+    create_post(user, "Hello")
+    create_post(user, "Hello", slug="hello-41")
+    with django_assert_num_queries(1):
+        assert allocate_slug(Post, "Hello") == "hello-42"
+
+
+def test_long_titles_keep_room_for_the_suffix(user):
+    title = "A very long title " * 10
+    first, second = create_post(user, title), create_post(user, title)
+    assert len(first.slug) == 50
+    assert second.slug.endswith("-2") and len(second.slug) <= 50
+
+
+def test_batches_allocate_distinct_slugs_in_one_query(user, django_assert_num_queries):
+    create_post(user, "Imported")
+    with django_assert_num_queries(1):
+        slugs = allocate_slugs(Post, ["Imported", "Imported", "Other", "Third post"])
+    assert slugs == ["imported-2", "imported-3", "other", "third-post"]
+
+
+def test_renamed_posts_redirect_from_their_old_slugs(user, client):
+    post = create_post(user, "First Title")
+    post.title = "Second Title"
+    post.save()
+    assert post.slug == "second-title"
+
+    response = client.get(reverse('blog:post_detail', args=["first-title"]))
+    assert response.status_code == 301
+    assert response['Location'] == reverse('blog:post_detail', args=["second-title"])
+    response = client.get(reverse('blog:post_comments', args=["first-title"]), {'page': 2})
+    assert response['Location'] == reverse('blog:post_comments', args=["second-title"]) + "?page=2"
+    assert client.get(reverse('blog:post_detail', args=["never-existed"])).status_code == 404
+
+    # Old slugs stay reserved for the post they redirect to
+    assert create_post(user, "First Title").slug == "first-title-2"
+
+    post.title = "First Title"
+    post.save()
+    assert post.slug == "first-title"
+    assert dict(SlugHistory.objects.values_list('slug', 'post')) == {"second-title": post.pk}
+
+
+def test_hand_set_slugs_survive_title_edits(user):
+    post = create_post(user, "Title", slug="custom")
+    post = Post.objects.get(pk=post.pk)
+    post.title = "Another title"
+    post.save()
+    assert post.slug == "custom"
+    assert not SlugHistory.objects.exists()
+
+
+def test_a_slug_taken_by_a_concurrent_save_is_allocated_again(user, monkeypatch):
+    Tag.objects.create(name="Django")
+    create_post(user, "Race")
+    # Both saves read the same free slug before either was written
+    stale = iter(["django", "race"])
+    monkeypatch.setattr(models, "allocate_slug", lambda model, text, exclude_pk=None: next(stale))
+
+    assert Tag.objects.create(name="Django!").slug == "django-2"
+    assert create_post(user, "Race").slug == "race-2"
@@ -0,0 +1,137 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from apps.blog.cache import category_scope, scope_versions
+from apps.blog.models import Category, Post, RelatedPost, Tag
+from apps.blog.search import search_posts
+from apps.blog.transfer import Importer, read_markdown
+
+
+def record(i, **fields):
+    return {
+        'title': f"Imported {i}",
+        'author': "writer",
+        'content': f"# Heading {i}\n\nSome *text* about zebras {i}.",
+        'published_at': "2024-05-01T10:00:00+00:00",
+        'categories': ["Web"],
+        'tags': ["django", f"tag-{i % 2}"],
+        **fields,
+    }
+
+
+@pytest.fixture
+def writer(db):
+    return User.objects.create_user(username="writer", password="password")
+
+
+def test_import_writes_batches_and_what_the_signals_would_have(writer, tmp_path):
+    Category.objects.create(name="Web")
+    source = tmp_path / "posts.jsonl"
+    source.write_text("\n".join(json.dumps(record(i)) for i in range(5)) + "\n\n")
+
+    out = StringIO()
+    call_command('blog_import', str(source), '--batch-size', '2', '--processes', '2', stdout=out)
+    assert "Imported 5 post(s): 5 new, 0 updated." in out.getvalue()
+    assert out.getvalue().count("post(s) imported") == 3  # One progress line per batch
+
+    post = Post.objects.get(title="Imported 3")
+    assert post.slug == "imported-3"
+    assert post.is_published and not post.needs_render
+    assert "<em>text</em>" in post.content_html
+    assert sorted(post.tags.values_list('name', flat=True)) == ["django", "tag-1"]
+    assert Category.objects.get().post_count == 5
+    assert dict(Tag.objects.values_list('name', 'post_count')) == {"django": 5, "tag-0": 3, "tag-1": 2}
+    assert search_posts("zebras").count() == 5
+    assert RelatedPost.objects.filter(post=post).count() == 4
+
+
+def test_import_updates_posts_by_slug_and_takes_front_matter(writer, tmp_path):
+    Importer(processes=1).run([record(1)])
+    (tmp_path / "imported-1.md").write_text(
+        "---\ntitle: Rewritten\nauthor: writer\npublished_at:\ntags: [python]\n---\n\nNew **body**.\n"
+    )
+    (tmp_path / "fresh.md").write_text("---\ntitle: Fresh\n---\nNo author, slug from the file name.")
+
+    created, updated = Importer(processes=1, default_author="writer").run(
+        read_markdown(path.read_text(), path.stem) for path in sorted(tmp_path.iterdir())
+    )
+    assert (created, updated) == (1, 1)
+    post = Post.objects.get(slug="imported-1")
+    assert post.title == "Rewritten" and not post.is_published
+    assert list(post.tags.values_list('name', flat=True)) == ["python"]
+    assert "<strong>body</strong>" in post.content_html
+    assert Post.objects.get(slug="fresh").author == writer
+    assert dict(Tag.objects.values_list('name', 'post_count')) == {"django": 0, "tag-1": 0, "python": 0}
+
+
+def test_bad_records_stop_the_import_with_a_message(writer, tmp_path):
+    source = tmp_path / "posts.jsonl"
+    source.write_text(json.dumps(record(1)) + "\n" + json.dumps(record(2, author="ghost")) + "\n")
+    with pytest.raises(CommandError, match="unknown author"):
+        call_command('blog_import', str(source), '--processes', '1', stdout=StringIO())
+    assert not Post.objects.exists()  # Same batch, same transaction
+
+    source.write_text(json.dumps(record(1, published_at="yesterday")) + "\n")
+    with pytest.raises(CommandError, match="record 1: published_at"):
+        call_command('blog_import', str(source), '--processes', '1', stdout=StringIO())
+
+
+def test_export_round_trips_through_import(writer, tmp_path):
+    post = Post.objects.create(title="Exported", author=writer, content="Some `code`.", published_at=timezone.now())
+    post.tags.add(Tag.objects.create(name="django"))
+    Post.objects.create(title="Draft", author=writer, content="Later.")
+
+    out = StringIO()
+    call_command('blog_export', '-', '--published', stdout=out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(item['slug'], item['tags'], item['content']) for item in records] == [("exported", ["django"], "Some `code`.")]
+
+    call_command('blog_export', str(tmp_path / "md"), '--format', 'markdown', stdout=StringIO())
+    assert sorted(path.name for path in (tmp_path / "md").iterdir()) == ["draft.md", "exported.md"]
+
+    Post.objects.filter(slug="exported").update(content="Changed.")
+    call_command('blog_import', str(tmp_path / "md"), '--processes', '1', stdout=StringIO())
+    assert Post.objects.get(slug="exported").content == "Some `code`."
+    assert Post.objects.count() == 2
+    assert not Post.objects.get(slug="draft").is_published
+
+
+def test_update_moves_updated_at_and_keeps_created_at(writer):
+    Importer(processes=1).run([record(1, created_at="2020-01-01T00:00:00+00:00")])
+    Post.objects.update(updated_at=timezone.now() - timedelta(days=1))
+    before = Post.objects.get()
+
+    Importer(processes=1).run([record(1, slug="imported-1", content="Changed.")])
+
+    post = Post.objects.get()
+    assert post.created_at == before.created_at
+    assert post.updated_at > before.updated_at
+
+
+def test_slugs_repeated_within_a_batch_do_not_collide(writer):
+    created, updated = Importer(processes=1).run([
+        record(1, title="Same"),  # Allocated "same"...
+        record(2, slug="same"),  # ...which a later record names explicitly
+        record(3, slug="twice"),
+        record(4, slug="twice", content="Second version."),
+    ])
+
+    assert (created, updated) == (3, 0)
+    assert Post.objects.get(slug="same").title == "Imported 2"
+    assert Post.objects.get(slug="same-2").title == "Same"
+    assert Post.objects.get(slug="twice").content == "Second version."
+
+
+def test_update_expires_the_categories_a_post_leaves(writer):
+    Importer(processes=1).run([record(1, categories=["Old"])])
+    before = scope_versions([category_scope("old")])
+
+    Importer(processes=1).run([record(1, slug="imported-1", categories=["New"])])
+
+    assert scope_versions([category_scope("old")]) != before
@@ -1,5 +1,17 @@
+from django.contrib.auth.models import User
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.core.cache import cache
+from datetime import timedelta
+
+from apps.blog.checks import rate_limit_cache_check
+from apps.blog.models import Category, Comment, Post, Tag
+from apps.blog.rendering import RenderService
+from apps.blog.pagination import decode_cursor, encode_cursor, keyset_paginate
+
 
 class BlogViewsTestCase(TestCase):
     def test_post_list(self):
@@ -12,6 +24,262 @@ class BlogViewsTestCase(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_post_detail_serves_stored_html(self):
+        user = User.objects.create_user(username="testuser", password="password")
+        post = Post.objects.create(
+            title="Detail Post", author=user, content="Some **bold** text.", published_at=timezone.now()
+        )
+        Post.objects.filter(pk=post.pk).update(content_html="<p>stored html</p>")
+
+        response = self.client.get(reverse('blog:post_detail', kwargs={'slug': post.slug}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<p>stored html</p>")
+
+
+class BlogConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.post = Post.objects.create(
+            title="Cached Post", author=self.user, content="Content", published_at=timezone.now()
+        )
+        self.url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+
+    def test_post_detail_revalidates_with_one_query(self):
+        response = self.client.get(self.url)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertIn('public', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        cached = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_post_detail_etag_changes_with_comments_and_viewer(self):
+        etag = self.client.get(self.url)['ETag']
+        Comment.objects.create(post=self.post, author="reader", content="New comment")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username="testuser", password="password")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_post_detail_etag_changes_when_the_post_is_rerendered(self):
+        Post.objects.filter(pk=self.post.pk).update(render_version="old")  # Rendered before an upgrade
+        etag = self.client.get(self.url)['ETag']
+        Post.objects.filter(pk=self.post.pk).rerender(service=RenderService(processes=1))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_listing_etag_changes_when_a_post_is_published(self):
+        url = reverse('blog:post_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Post.objects.create(title="Another", author=self.user, content="Content", published_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(BLOG_COMMENTS_PER_PAGE=2)
+class BlogCommentsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.post = Post.objects.create(
+            title="Commented Post", author=self.user, content="Content", published_at=timezone.now()
+        )
+        self.comments = [
+            Comment.objects.create(post=self.post, author="reader", content=f"Comment {i}") for i in range(5)
+        ]
+        for comment in self.comments:
+            Comment.objects.create(post=self.post, parent=comment, author="replier", content=f"Reply to {comment.content}")
+
+    def test_post_detail_renders_one_page_of_threads(self):
+        url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+        # validators + post + comment count + comment page + replies prefetch + related posts
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertContains(response, "Comments (10)")
+        self.assertContains(response, "Reply to Comment 1")
+        self.assertNotContains(response, "Comment 2")
+        self.assertContains(response, reverse('blog:post_comments', kwargs={'slug': self.post.slug}) + "?page=2")
+
+    def test_post_comments_returns_further_pages(self):
+        url = reverse('blog:post_comments', kwargs={'slug': self.post.slug})
+        response = self.client.get(url, {'page': 3}, HTTP_HX_REQUEST='true')
+        self.assertContains(response, "Comment 4")
+        self.assertContains(response, "Reply to Comment 4")
+        self.assertNotContains(response, "Load more comments")
+
+    def test_reply_to_reply_joins_the_thread(self):
+        self.client.login(username="testuser", password="password")
+        reply = self.comments[0].replies.get()
+        response = self.client.post(
+            reverse('blog:post_detail', kwargs={'slug': self.post.slug}),
+            data={'content': "Nested reply", 'parent': reply.pk},
+        )
+        self.assertRedirects(response, reverse('blog:post_detail', kwargs={'slug': self.post.slug}))
+        self.assertEqual(Comment.objects.get(content="Nested reply").parent, self.comments[0])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 11)
+
+    def test_htmx_comment_returns_only_the_new_comment(self):
+        cache.clear()
+        self.client.login(username="testuser", password="password")
+        url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+        response = self.client.post(url, data={'content': "Quick one"}, HTTP_HX_REQUEST='true')
+
+        self.assertEqual(response.status_code, 200)
+        comment = Comment.objects.get(content="Quick one")
+        self.assertContains(response, f'id="comment-{comment.pk}"')
+        self.assertContains(response, "Comments (11)")
+        self.assertNotContains(response, "Comment 0")
+        self.assertNotContains(response, "<html")
+
+    def test_htmx_comment_errors_go_to_the_error_slot(self):
+        cache.clear()
+        self.client.login(username="testuser", password="password")
+        url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+        response = self.client.post(url, data={'content': ""}, HTTP_HX_REQUEST='true')
+
+        self.assertEqual(response['HX-Retarget'], '#comment-errors')
+        self.assertContains(response, "This field is required.")
+        self.assertEqual(Comment.objects.count(), 10)
+
+    @override_settings(BLOG_COMMENT_RATE_LIMIT=2, BLOG_COMMENT_RATE_WINDOW=3600)
+    def test_comments_are_rate_limited_per_user(self):
+        cache.clear()
+        self.client.login(username="testuser", password="password")
+        url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+        for number in range(2):
+            self.client.post(url, data={'content': f"Burst {number}"})
+
+        response = self.client.post(url, data={'content': "Burst 2"})
+        self.assertRedirects(response, url)
+        self.assertGreater(int(response['Retry-After']), 0)
+        response = self.client.post(url, data={'content': "Burst 3"}, HTTP_HX_REQUEST='true')
+        self.assertContains(response, "commenting too fast")
+        self.assertEqual(Comment.objects.filter(content__startswith="Burst").count(), 2)
+
+        User.objects.create_user(username="other", password="password")
+        self.client.login(username="other", password="password")
+        self.client.post(url, data={'content': "Burst 4"})
+        self.assertTrue(Comment.objects.filter(content="Burst 4").exists())
+
+    @override_settings(BLOG_COMMENT_RATE_LIMIT=1, BLOG_COMMENT_RATE_WINDOW=3600)
+    def test_pending_messages_are_not_revalidated_away(self):
+        cache.clear()
+        self.client.login(username="testuser", password="password")
+        url = reverse('blog:post_detail', kwargs={'slug': self.post.slug})
+        self.client.post(url, data={'content': "Once"}, follow=True)  # Shows its own message
+        etag = self.client.get(url)['ETag']
+
+        self.client.post(url, data={'content': "Twice"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "commenting too fast")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_per_process_rate_limit_cache_is_reported_outside_debug(self):
+        with self.settings(DEBUG=False):
+            self.assertEqual([message.id for message in rate_limit_cache_check(None)], ['blog.W001'])
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/blog-cache'}
+        with self.settings(DEBUG=False, CACHES={'default': shared}):
+            self.assertEqual(rate_limit_cache_check(None), [])
+
+
+@override_settings(BLOG_POSTS_PER_PAGE=2)
+class BlogPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.category = Category.objects.create(name="Django")
+        self.tag = Tag.objects.create(name="Python")
+        now = timezone.now()
+        self.posts = []
+        for i in range(5):
+            post = Post.objects.create(
+                title=f"Post {i}", author=self.user, content="Content", published_at=now - timedelta(hours=i)
+            )
+            post.categories.add(self.category)
+            post.tags.add(self.tag)
+            self.posts.append(post)
+        Post.objects.create(title="Draft", author=self.user, content="Content")
+
+    def titles(self, response):
+        return [post.title for post in response.context['posts']]
+
+    def test_post_list_is_paginated(self):
+        response = self.client.get(reverse('blog:post_list'), {'page': 2})
+        self.assertEqual(self.titles(response), ["Post 2", "Post 3"])
+        self.assertEqual(response.context['posts'].paginator.num_pages, 3)
+        self.assertContains(response, "Page 2 of 3")
+
+    def test_keyset_pagination_walks_forward_and_back(self):
+        url = reverse('blog:post_list')
+        with self.settings(BLOG_PAGINATION_MODE='keyset'):
+            first = self.client.get(url)
+            self.assertEqual(self.titles(first), ["Post 0", "Post 1"])
+            self.assertFalse(first.context['posts'].has_previous())
+
+            second = self.client.get(url, {'after': first.context['posts'].next_cursor})
+            self.assertEqual(self.titles(second), ["Post 2", "Post 3"])
+
+            back = self.client.get(url, {'before': second.context['posts'].previous_cursor})
+            self.assertEqual(self.titles(back), ["Post 0", "Post 1"])
+            self.assertFalse(back.context['posts'].has_previous())
+
+    def test_stale_before_cursor_falls_back_to_the_first_page(self):
+        newest = encode_cursor(self.posts[0])
+        self.posts[0].unpublish()
+        response = self.client.get(reverse('blog:post_list'), {'before': newest})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response), ["Post 1", "Post 2"])
+        self.assertFalse(response.context['posts'].has_previous())
+
+    def test_keyset_pagination_avoids_offset_and_count(self):
+        first = keyset_paginate(Post.objects.filter(published_at__isnull=False), 2)
+        with CaptureQueriesContext(connection) as queries:
+            page = keyset_paginate(Post.objects.filter(published_at__isnull=False), 2, after=decode_cursor(first.next_cursor))
+        self.assertEqual([post.title for post in page], ["Post 2", "Post 3"])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("OFFSET", queries[0]['sql'])
+        self.assertNotIn("COUNT", queries[0]['sql'])
+        self.assertIsNone(decode_cursor("not-a-cursor"))
+
+    def test_category_and_tag_listings_are_paginated(self):
+        for url in (
+            reverse('blog:post_list_by_category', args=[self.category.slug]),
+            reverse('blog:post_list_by_tag', args=[self.tag.slug]),
+        ):
+            response = self.client.get(url, {'page': 3})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.titles(response), ["Post 4"])
+
+    def test_post_list_query_count_does_not_grow_with_posts(self):
+        with self.settings(BLOG_POSTS_PER_PAGE=10):
+            # validators + page + count + categories/tags prefetch + sidebar categories/tags
+            with self.assertNumQueries(7):
+                response = self.client.get(reverse('blog:post_list'))
+        self.assertEqual(len(response.context['posts']), 5)
+        self.assertContains(response, "#Python")
+
+    def test_listing_defers_markdown_columns(self):
+        post = Post.objects.published().for_listing().first()
+        self.assertEqual(post.get_deferred_fields(), {'content', 'content_html', 'toc_html', 'toc'})
+        self.assertEqual(post.excerpt, "Content")
+        self.assertEqual(post.reading_time, 1)
+
+    def test_listing_excerpts_are_escaped_once(self):
+        post = self.posts[0]
+        post.content = 'Tom & Jerry say "hi" <3\n\n    if a < b: print("ok")'
+        post.published_at = timezone.now()
+        post.save()
+
+        self.assertEqual(post.excerpt, 'Tom & Jerry say "hi" <3 if a < b: print("ok")')
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertContains(response, "Tom &amp; Jerry say &quot;hi&quot; &lt;3 if a &lt; b: print(&quot;ok&quot;)")
+
 
 # from django.test import TestCase, Client
 # from django.contrib.auth.models import User
@@ -0,0 +1,287 @@
+"""
+Bulk import and export of posts, behind `manage.py blog_import` and `manage.py blog_export`.
+
+A post travels as a record: ``title``, ``slug``, ``author`` (a username), ``content`` (Markdown),
+``created_at`` and ``published_at`` (ISO 8601, ``published_at`` null for drafts), ``categories`` and
+``tags`` (lists of names). On disk a record is a line of a ``.jsonl`` file, or a ``.md`` file whose
+YAML front matter holds everything but the content; the file name is the slug when none is given.
+
+Imports skip `Post.save()` and the signals: each batch of records is written with `bulk_create` and
+`bulk_update` in one transaction, categories and tags are resolved through in-memory maps, and the
+Markdown of the next batch renders in a process pool while the current one is written. What the
+signals would have maintained (search index, related posts, counters, cached pages, sitemaps) is
+brought up to date by the importer. A record whose slug exists updates that post.
+"""
+import json
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+import yaml
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.sitemaps import schedule_refresh as schedule_sitemap_refresh
+
+from .cache import LISTING_SCOPE, bump_scopes, category_scope, post_scope, tag_scope
+from .counters import rebuild_post_counts
+from .models import Category, Post, Tag
+from .related import update_related_posts
+from .rendering import RenderService
+from .search import index_posts
+from .slugs import allocate_slugs
+
+FRONT_MATTER = '---\n'
+
+# Written on update, besides the rendered fields; bulk_update() skips auto_now, so updated_at is set here
+UPDATED_FIELDS = ['title', 'author', 'content', 'created_at', 'updated_at', 'published_at', 'status']
+
+
+def read_jsonl(lines):
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"line {number}: {error}") from None
+
+
+def read_markdown(text, slug=None):
+    """A record from Markdown with optional YAML front matter; `slug` is used when it names none."""
+    meta = {}
+    if text.startswith(FRONT_MATTER):
+        end = text.find(f'\n{FRONT_MATTER}', len(FRONT_MATTER) - 1)
+        if end == -1:
+            raise ValueError("front matter is not closed")
+        meta = yaml.safe_load(text[len(FRONT_MATTER):end]) or {}
+        text = text[end + len(FRONT_MATTER) + 1:].lstrip('\n')
+    if slug and not meta.get('slug'):
+        meta['slug'] = slug
+    return {**meta, 'content': text}
+
+
+def read_paths(paths):
+    """Records from ``.jsonl`` and ``.md`` files, or directories of them, read lazily in order."""
+    for path in map(Path, paths):
+        files = sorted(child for child in path.rglob('*') if child.suffix in ('.jsonl', '.md')) if path.is_dir() else [path]
+        for file in files:
+            try:
+                if file.suffix == '.jsonl':
+                    with open(file, encoding='utf-8') as lines:
+                        yield from read_jsonl(lines)
+                else:
+                    yield read_markdown(file.read_text(encoding='utf-8'), file.stem)
+            except ValueError as error:
+                raise ValueError(f"{file}: {error}") from None
+
+
+def post_record(post):
+    """The record of a post fetched with `export_posts()`."""
+    return {
+        'title': post.title,
+        'slug': post.slug,
+        'author': post.author.username,
+        'created_at': post.created_at.isoformat(),
+        'published_at': post.published_at.isoformat() if post.published_at else None,
+        'categories': [category.name for category in post.categories.all()],
+        'tags': [tag.name for tag in post.tags.all()],
+        'content': post.content,
+    }
+
+
+def markdown_file(record):
+    meta = {key: value for key, value in record.items() if key != 'content'}
+    front_matter = yaml.safe_dump(meta, sort_keys=False, allow_unicode=True)
+    return f"{FRONT_MATTER}{front_matter}{FRONT_MATTER}\n{record['content']}"
+
+
+def export_posts(posts, batch_size=500):
+    """Records of `posts`, fetched `batch_size` at a time."""
+    posts = posts.select_related('author').prefetch_related('categories', 'tags').defer(*Post.RENDER_FIELDS)
+    for post in posts.order_by('pk').iterator(chunk_size=batch_size):
+        yield post_record(post)
+
+
+def parse_date(value, field):
+    if value in (None, ''):
+        return None
+    if not isinstance(value, datetime):  # YAML reads unquoted timestamps as datetimes
+        parsed = parse_datetime(str(value))
+        if parsed is None:
+            raise ValueError(f"{field}: not an ISO 8601 date: {value!r}")
+        value = parsed
+    return value if timezone.is_aware(value) else timezone.make_aware(value)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Importer:
+    """
+    Writes records in batches; see the module docstring.
+
+    `processes` is the size of the rendering pool (None: see `RenderService`, 1: render inline);
+    `default_author` the username for records without a known author; `progress(message)` is called
+    after every batch.
+    """
+
+    def __init__(self, batch_size=500, processes=None, default_author=None, progress=None):
+        self.batch_size = batch_size
+        self.processes = processes
+        self.default_author = default_author
+        self.progress = progress or (lambda message: None)
+        self.authors = {}
+        # name -> (pk, slug), loaded once and extended as batches create rows
+        self.taxonomies = {
+            model: {name: (pk, slug) for name, pk, slug in model.objects.values_list('name', 'pk', 'slug')}
+            for model in (Category, Tag)
+        }
+        self.created = self.updated = 0
+        self.post_ids = []
+        self.scopes = {LISTING_SCOPE}
+
+    def run(self, records):
+        """Import every record. Returns (created, updated) counts."""
+        started = time.monotonic()
+        with RenderService(processes=self.processes) as service:
+            pending = None
+            for start, batch in enumerate(batched(records, self.batch_size)):
+                batch = [self.clean(record, start * self.batch_size + index + 1) for index, record in enumerate(batch)]
+                # Submitted now, so the pool renders this batch while the previous one is written
+                rendering = service.submit([record['content'] for record in batch])
+                if pending:
+                    self.write(*pending)
+                    self.report(started)
+                pending = batch, rendering
+            if pending:
+                self.write(*pending)
+                self.report(started)
+
+        self.finish()
+        return self.created, self.updated
+
+    def clean(self, record, number):
+        if not isinstance(record, dict):
+            raise ValueError(f"record {number}: not an object")
+        if not record.get('title') or record.get('content') is None:
+            raise ValueError(f"record {number}: title and content are required")
+        try:
+            created_at = parse_date(record.get('created_at'), 'created_at')
+            published_at = parse_date(record.get('published_at'), 'published_at')
+        except ValueError as error:
+            raise ValueError(f"record {number}: {error}") from None
+        return {
+            'title': str(record['title'])[:Post._meta.get_field('title').max_length],
+            'slug': record.get('slug') or None,
+            'author': record.get('author') or self.default_author,
+            'content': str(record['content']),
+            'created_at': created_at,  # None: now for a new post, unchanged for an existing one
+            'published_at': published_at,
+            'categories': [str(name) for name in record.get('categories') or []],
+            'tags': [str(name) for name in record.get('tags') or []],
+        }
+
+    def resolve_authors(self, batch):
+        missing = {record['author'] for record in batch} - set(self.authors) - {None}
+        if missing:
+            self.authors.update(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+        unknown = sorted({record['author'] or '(none)' for record in batch if record['author'] not in self.authors})
+        if unknown:
+            raise ValueError(f"unknown author(s): {', '.join(unknown)}; pass a default author for them")
+
+    def resolve_taxonomies(self, model, names):
+        """Primary keys of the `model` rows named `names`, creating the missing ones in bulk."""
+        known = self.taxonomies[model]
+        missing = list(dict.fromkeys(name for name in names if name not in known))
+        if missing:
+            rows = model.objects.bulk_create(
+                [model(name=name, slug=slug) for name, slug in zip(missing, allocate_slugs(model, missing))]
+            )
+            known.update((row.name, (row.pk, row.slug)) for row in rows)
+        return [known[name][0] for name in names]
+
+    def write(self, batch, rendering):
+        documents = list(rendering)
+        self.resolve_authors(batch)
+        existing = {
+            slug: (pk, created_at) for slug, pk, created_at in
+            Post.objects.filter(slug__in=[record['slug'] for record in batch if record['slug']])
+            .values_list('slug', 'pk', 'created_at')
+        }
+        explicit = {record['slug'] for record in batch if record['slug']}
+        new_slugs = iter(allocate_slugs(
+            Post, [record['title'] for record in batch if not record['slug']], reserved=explicit
+        ))
+
+        now = timezone.now()
+        entries = {}  # slug -> (record, post)
+        for record, document in zip(batch, documents):
+            slug = record['slug'] or next(new_slugs)
+            pk, created_at = existing.get(slug, (None, now))
+            post = Post(
+                pk=pk,
+                slug=slug,
+                title=record['title'],
+                author_id=self.authors[record['author']],
+                content=record['content'],
+                created_at=record['created_at'] or created_at,
+                updated_at=now,
+                published_at=record['published_at'],
+                status=Post.status_for(record['published_at']),
+            )
+            post.set_rendered(document)
+            entries[slug] = record, post  # A slug repeated in the batch: the later record wins
+        batch = [record for record, _ in entries.values()]
+        posts = [post for _, post in entries.values()]
+        created = [post for post in posts if post.pk is None]
+        updated = [post for post in posts if post.pk is not None]
+
+        with transaction.atomic():
+            category_ids = [self.resolve_taxonomies(Category, record['categories']) for record in batch]
+            tag_ids = [self.resolve_taxonomies(Tag, record['tags']) for record in batch]
+
+            Post.objects.bulk_create(created)
+            Post.objects.bulk_update(updated, [*UPDATED_FIELDS, *Post.RENDER_FIELDS])
+            # Pages of the categories and tags the updated posts leave are expired too
+            self.scopes.update(map(category_scope, Category.objects.filter(posts__in=updated).values_list('slug', flat=True)))
+            self.scopes.update(map(tag_scope, Tag.objects.filter(posts__in=updated).values_list('slug', flat=True)))
+            Post.categories.through.objects.filter(post__in=updated).delete()
+            Post.tags.through.objects.filter(post__in=updated).delete()
+            Post.categories.through.objects.bulk_create(
+                [
+                    Post.categories.through(post_id=post.pk, category_id=category_id)
+                    for post, ids in zip(posts, category_ids) for category_id in set(ids)
+                ]
+            )
+            Post.tags.through.objects.bulk_create(
+                [Post.tags.through(post_id=post.pk, tag_id=tag_id) for post, ids in zip(posts, tag_ids) for tag_id in set(ids)]
+            )
+            index_posts([post.pk for post in posts])
+
+        self.created += len(created)
+        self.updated += len(updated)
+        self.post_ids += [post.pk for post in posts]
+        self.scopes.update(post_scope(post.slug) for post in updated)
+        for model, scope, names in ((Category, category_scope, 'categories'), (Tag, tag_scope, 'tags')):
+            self.scopes.update(scope(self.taxonomies[model][name][1]) for record in batch for name in record[names])
+
+    def report(self, started):
+        done = self.created + self.updated
+        self.progress(f"{done} post(s) imported ({self.created} new, {self.updated} updated), "
+                      f"{done / max(time.monotonic() - started, 1e-6):.0f}/s")
+
+    def finish(self):
+        """Bring up to date what the signals would have: related posts, counters, cached pages, sitemaps."""
+        for number, post_id in enumerate(self.post_ids, 1):
+            update_related_posts(post_id)
+            if number % self.batch_size == 0:
+                self.progress(f"Related posts updated for {number} post(s)")
+        rebuild_post_counts()
+        bump_scopes(*self.scopes)
+        schedule_sitemap_refresh()
@@ -1,16 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'blog'  # Important for namespaced URLs
 
+# Under ASGI the read views have async versions, see core/asgi.py
+read_views = async_views if getattr(settings, 'BLOG_ASYNC_VIEWS', False) else views
+
 urlpatterns = [
-    path('', views.post_list, name='post_list'),
+    path('', read_views.post_list, name='post_list'),
     path('post/create/', views.post_create, name='post_create'),
-    path('post/<slug:slug>/', views.post_detail, name='post_detail'),
+    path('post/<slug:slug>/', read_views.post_detail, name='post_detail'),
+    path('post/<slug:slug>/comments/', views.post_comments, name='post_comments'),
     path('post/<slug:slug>/edit/', views.post_edit, name='post_edit'),
     path('post/<slug:slug>/delete/', views.post_delete, name='post_delete'),
-    path('category/<slug:slug>/', views.post_list_by_category, name='post_list_by_category'),
-    path('tag/<slug:slug>/', views.post_list_by_tag, name='post_list_by_tag'),
+    path('category/<slug:slug>/', read_views.post_list_by_category, name='post_list_by_category'),
+    path('tag/<slug:slug>/', read_views.post_list_by_tag, name='post_list_by_tag'),
     path('post/<slug:slug>/publish/', views.post_publish, name='post_publish'),
     path('post/<slug:slug>/unpublish/', views.post_unpublish, name='post_unpublish'),
+    path('feed/<str:fmt>/', views.post_feed, name='post_feed'),
+    path('category/<slug:slug>/feed/<str:fmt>/', views.category_feed, name='category_feed'),
+    path('tag/<slug:slug>/feed/<str:fmt>/', views.tag_feed, name='tag_feed'),
 ]
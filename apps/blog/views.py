@@ -1,56 +1,139 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponsePermanentRedirect, HttpResponseForbidden
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
 from django.urls import reverse
-from .models import Post, Category, Tag, Comment
+from django_htmx.http import reswap, retarget
+from .models import Post, Category, SlugHistory, Tag
+from .cache import LISTING_SCOPE, cache_anonymous_page, category_scope, post_scope, tag_scope
+from .conditional import (
+    category_feed_validators,
+    category_validators,
+    conditional_feed,
+    conditional_page,
+    post_detail_validators,
+    post_feed_validators,
+    post_list_validators,
+    tag_feed_validators,
+    tag_validators,
+    validated_last_modified,
+)
+from .feeds import feed_response
 from .forms import PostForm, CommentForm
-from markdown import markdown
+from .pagination import paginate_comments, paginate_posts, paginate_search_results
+from .ratelimit import comment_retry_after
+from .related import related_posts_for
+from .search import search_posts
+
+def renamed_post_redirect(request, slug):
+    """A permanent redirect from an old slug of a renamed post to the same view of its current slug."""
+    current = SlugHistory.objects.filter(slug=slug).values_list('post__slug', flat=True).first()
+    if current is None:
+        raise Http404("No Post matches the given query.")
+    match = request.resolver_match
+    url = reverse(match.view_name, args=match.args, kwargs={**match.kwargs, 'slug': current})
+    query = request.META.get('QUERY_STRING')
+    return HttpResponsePermanentRedirect(f'{url}?{query}' if query else url)
 
 # List all posts (Home page)
+@conditional_page(post_list_validators)
+@cache_anonymous_page(lambda: [LISTING_SCOPE])
 def post_list(request):
-    posts = Post.objects.filter(published_at__lte=timezone.now()).order_by('-created_at')  # Published posts only
-    categories = Category.objects.all()
-    tags = Tag.objects.all()
+    query = request.GET.get('q', '').strip()
+    if query:
+        posts = paginate_search_results(request, search_posts(query).for_listing())  # Ranked, with snippets
+    else:
+        posts = paginate_posts(request, Post.objects.published().for_listing())  # Published posts only
 
     context = {
+        'query': query,
         'posts': posts,
-        'categories': categories,
-        'tags': tags,
     }
     return render(request, 'blog/post_list.html', context)
 
 # Display a single post
+@conditional_page(post_detail_validators)
+@cache_anonymous_page(lambda slug: [post_scope(slug)])
 def post_detail(request, slug):
-    post = get_object_or_404(Post, slug=slug)
-    comments = post.comments.order_by('created_at')  # Fetch comments ordered by creation time
-    post_content_html = markdown(post.content)  # Render Markdown to HTML
+    post = Post.objects.select_related('author').filter(slug=slug).first()
+    if post is None:
+        return renamed_post_redirect(request, slug)
 
     if request.method == 'POST' and request.user.is_authenticated:
-        comment_form = CommentForm(request.POST)
-        if comment_form.is_valid():
-            comment = comment_form.save(commit=False)
-            comment.post = post
-            comment.author = request.user.username
-            comment.save()
-            messages.success(request, 'Your comment has been posted!')
-            return redirect('post_detail', slug=slug)  # Avoid duplicate comment submission
+        # Handled before the comments, Markdown and related posts are loaded
+        comment_form, response = post_comment(request, post)
+        if response is not None:
+            return response
     else:
-        comment_form = CommentForm()
+        comment_form = CommentForm(post=post)
 
     context = {
         'post': post,
-        'post_content_html': post_content_html,
-        'comments': comments,
+        'post_content_html': post.get_markdown(),  # Pre-rendered when the post was saved
+        'comments': paginate_comments(post, 1),  # First page of threads, replies prefetched
         'comment_form': comment_form,
+        'related_posts': related_posts_for(post),
     }
     return render(request, 'blog/post_detail.html', context)
 
+def post_comment(request, post):
+    """
+    Save a comment posted to `post`. Returns the bound form and the response to send, or None when
+    the page should be shown again with the form's errors.
+
+    htmx submissions get only the new comment back; a browser's form post is redirected to the page.
+    """
+    retry_after = comment_retry_after(request)
+    if retry_after:
+        message = f'You are commenting too fast. Please wait {retry_after} seconds.'
+        if request.htmx:
+            response = comment_error(request, message)
+        else:
+            messages.warning(request, message)
+            response = redirect('blog:post_detail', slug=post.slug)
+        response['Retry-After'] = retry_after
+        return None, response
+
+    comment_form = CommentForm(request.POST, post=post)
+    if not comment_form.is_valid():
+        if request.htmx:
+            errors = ' '.join(error for errors in comment_form.errors.values() for error in errors)
+            return comment_form, comment_error(request, errors)
+        return comment_form, None
+
+    comment = comment_form.save(commit=False)
+    comment.post = post
+    comment.author = request.user.username
+    comment.save()  # The counter is incremented in the database by apps/blog/signals.py
+    if request.htmx:
+        post.refresh_from_db(fields=['comment_count'])
+        return comment_form, render(request, 'blog/partials/new_comment.html', {'post': post, 'comment': comment})
+    messages.success(request, 'Your comment has been posted!')
+    return comment_form, redirect('blog:post_detail', slug=post.slug)  # Avoid duplicate comment submission
+
+def comment_error(request, message):
+    # htmx only swaps successful responses, so the message is sent as one, into the error slot
+    response = render(request, 'blog/partials/comment_error.html', {'message': message})
+    return reswap(retarget(response, '#comment-errors'), 'innerHTML')
+
+# Further comment pages, loaded on demand with htmx
+@cache_anonymous_page(lambda slug: [post_scope(slug)])
+def post_comments(request, slug):
+    post = Post.objects.filter(slug=slug).first()
+    if post is None:
+        return renamed_post_redirect(request, slug)
+    context = {
+        'post': post,
+        'comments': paginate_comments(post, request.GET.get('page')),
+    }
+    return render(request, 'blog/partials/comment_page.html', context)
+
 # Category-based post listing
+@conditional_page(category_validators)
+@cache_anonymous_page(lambda slug: [category_scope(slug)])
 def post_list_by_category(request, slug):
     category = get_object_or_404(Category, slug=slug)
-    posts = category.posts.filter(published_at__lte=timezone.now()).order_by('-created_at')
+    posts = paginate_posts(request, category.posts.published().for_listing())
 
     context = {
         'category': category,
@@ -59,9 +142,11 @@ def post_list_by_category(request, slug):
     return render(request, 'blog/post_list_by_category.html', context)
 
 # Tag-based post listing
+@conditional_page(tag_validators)
+@cache_anonymous_page(lambda slug: [tag_scope(slug)])
 def post_list_by_tag(request, slug):
     tag = get_object_or_404(Tag, slug=slug)
-    posts = Post.objects.filter(tags__slug=tag.slug, published_at__lte=timezone.now()).order_by('-created_at')
+    posts = paginate_posts(request, tag.posts.published().for_listing())
 
     context = {
         'tag': tag,
@@ -69,6 +154,35 @@ def post_list_by_tag(request, slug):
     }
     return render(request, 'blog/post_list_by_tag.html', context)
 
+# Feed of all posts: rss, atom or json
+@conditional_feed(post_feed_validators)
+def post_feed(request, fmt):
+    return feed_response(
+        request, fmt, Post.objects.published(), [LISTING_SCOPE],
+        title='Blog Posts', link=reverse('blog:post_list'), description='The latest blog posts.',
+        updated=validated_last_modified(request),
+    )
+
+# Feed of a category's posts
+@conditional_feed(category_feed_validators)
+def category_feed(request, slug, fmt):
+    category = get_object_or_404(Category, slug=slug)
+    return feed_response(
+        request, fmt, category.posts.published(), [category_scope(slug)],
+        title=f'Posts in {category.name}', link=reverse('blog:post_list_by_category', args=[slug]),
+        description=f'The latest blog posts in {category.name}.', updated=validated_last_modified(request),
+    )
+
+# Feed of a tag's posts
+@conditional_feed(tag_feed_validators)
+def tag_feed(request, slug, fmt):
+    tag = get_object_or_404(Tag, slug=slug)
+    return feed_response(
+        request, fmt, tag.posts.published(), [tag_scope(slug)],
+        title=f'Posts tagged {tag.name}', link=reverse('blog:post_list_by_tag', args=[slug]),
+        description=f'The latest blog posts tagged {tag.name}.', updated=validated_last_modified(request),
+    )
+
 # Create a new post
 @login_required
 def post_create(request):
@@ -80,7 +194,7 @@ def post_create(request):
             post.save()
             form.save_m2m()  # Save many-to-many data for categories and tags
             messages.success(request, 'Your post has been created successfully!')
-            return redirect('post_detail', slug=post.slug)
+            return redirect('blog:post_detail', slug=post.slug)
     else:
         form = PostForm()
 
@@ -103,7 +217,7 @@ def post_edit(request, slug):
             post = form.save()
             form.save_m2m()  # Save many-to-many data
             messages.success(request, 'Your post has been updated successfully!')
-            return redirect('post_detail', slug=post.slug)
+            return redirect('blog:post_detail', slug=post.slug)
     else:
         form = PostForm(instance=post)
 
@@ -123,7 +237,7 @@ def post_delete(request, slug):
     if request.method == 'POST':
         post.delete()
         messages.success(request, 'Your post has been deleted!')
-        return redirect('post_list')
+        return redirect('blog:post_list')
 
     context = {
         'post': post,
@@ -139,7 +253,7 @@ def post_publish(request, slug):
 
     post.publish()
     messages.success(request, f'{post.title} has been published!')
-    return redirect('post_detail', slug=slug)
+    return redirect('blog:post_detail', slug=slug)
 
 # Unpublish a post (Admin or Author only)
 @login_required
@@ -150,4 +264,4 @@ def post_unpublish(request, slug):
 
     post.unpublish()
     messages.success(request, f'{post.title} has been unpublished.')
-    return redirect('post_detail', slug=slug)
+    return redirect('blog:post_detail', slug=slug)
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'updated_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['attempts', 'locked_at', 'locked_by', 'last_error', 'created_at', 'updated_at']
+    actions = ['retry']
+
+    @admin.action(description='Retry selected tasks now')
+    def retry(self, request, queryset):
+        count = queryset.exclude(status=Task.Status.RUNNING).update(
+            status=Task.Status.QUEUED, attempts=0, run_at=timezone.now(), updated_at=timezone.now()
+        )
+        self.message_user(request, f'{count} task(s) queued again.')
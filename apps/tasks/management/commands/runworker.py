@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.queue import registry
+from apps.tasks.worker import run_workers
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (emails, image derivatives, re-rendering) until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=2, help="Worker threads per process.")
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes, for CPU-bound tasks.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls when idle.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no task is due, e.g. from cron.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Registered tasks: {', '.join(sorted(registry)) or '-'}")
+        run_workers(
+            processes=max(options["processes"], 1),
+            threads=max(options["threads"], 1),
+            poll_interval=options["interval"],
+            burst=options["burst"],
+        )
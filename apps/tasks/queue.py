@@ -0,0 +1,130 @@
+"""
+A small database-backed task queue.
+
+Decorate a function with `@task` and call `.delay(*args, **kwargs)` to store the call in the `Task`
+table; `manage.py runworker` claims due tasks and runs them, retrying failures with exponential
+backoff. Arguments must be JSON serializable. Tasks are enqueued in the caller's transaction, so a
+worker never sees a task whose transaction rolled back. With `TASKS_ALWAYS_EAGER`, `.delay()` runs
+the function inline instead, which is handy without a worker.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# task name -> TaskFunction, filled as the apps' tasks modules are imported
+registry = {}
+
+
+def always_eager():
+    return getattr(settings, 'TASKS_ALWAYS_EAGER', False)
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'TASKS_LOCK_TIMEOUT', 60 * 10))
+
+
+def backoff(attempts):
+    """Delay before retrying a task that failed `attempts` times: 10s, 20s, 40s... up to an hour."""
+    base = getattr(settings, 'TASKS_RETRY_BACKOFF', 10)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), getattr(settings, 'TASKS_RETRY_BACKOFF_MAX', 60 * 60)))
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts=None):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, run_at=None):
+        """Queue a call, to run at `run_at` or as soon as a worker is free. Returns the `Task`."""
+        kwargs = kwargs or {}
+        if always_eager():
+            self.func(*args, **kwargs)
+            return None
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=self.max_attempts or getattr(settings, 'TASKS_MAX_ATTEMPTS', 5),
+            run_at=run_at or timezone.now(),
+        )
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Register `func` as a task: `func.delay(...)` queues a call for the workers."""
+    def decorator(func):
+        task_function = TaskFunction(func, name or f'{func.__module__}.{func.__qualname__}', max_attempts)
+        registry[task_function.name] = task_function
+        return task_function
+
+    return decorator(func) if func else decorator
+
+
+def requeue_stale():
+    """Put back tasks whose worker died while running them. Returns how many were requeued."""
+    return Task.objects.filter(
+        status=Task.Status.RUNNING, locked_at__lt=timezone.now() - lock_timeout()
+    ).update(status=Task.Status.QUEUED, locked_at=None, locked_by='', updated_at=timezone.now())
+
+
+def claim(worker, limit=1):
+    """
+    Claim up to `limit` due tasks for `worker`.
+
+    Each candidate is taken with a conditional UPDATE on its status, so concurrent workers, threads
+    or processes never run the same task twice, without needing SELECT ... FOR UPDATE (SQLite).
+    """
+    now = timezone.now()
+    due = Task.objects.filter(status=Task.Status.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    claimed = []
+    for pk in due.values_list('pk', flat=True)[:limit * 4]:
+        taken = Task.objects.filter(pk=pk, status=Task.Status.QUEUED).update(
+            status=Task.Status.RUNNING, locked_at=now, locked_by=worker, attempts=F('attempts') + 1, updated_at=now,
+        )
+        if taken:
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def execute(task):
+    """Run a claimed task. Done tasks are deleted, failed ones retried later or marked failed."""
+    try:
+        task_function = registry.get(task.name)
+        if task_function is None:
+            raise LookupError(f'Unknown task {task.name!r}')
+        task_function.func(*task.args, **task.kwargs)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            logger.warning('Task %s #%s failed (attempt %s), retrying', task.name, task.pk, task.attempts)
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.Status.QUEUED, run_at=now + backoff(task.attempts),
+                locked_at=None, locked_by='', last_error=error, updated_at=now,
+            )
+        else:
+            logger.error('Task %s #%s failed after %s attempts', task.name, task.pk, task.attempts)
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.Status.FAILED, locked_at=None, locked_by='', last_error=error, updated_at=now,
+            )
+        return False
+    Task.objects.filter(pk=task.pk).delete()
+    return True
@@ -0,0 +1,125 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.tasks import worker
+from apps.tasks.models import Task
+from apps.tasks.queue import claim, execute, requeue_stale, task
+from apps.tasks.worker import work
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise ValueError("boom")
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+@pytest.mark.django_db
+def test_delay_stores_the_call_for_a_worker():
+    queued = record.delay(42)
+
+    assert calls == []
+    assert queued.name == record.name
+    assert (queued.args, queued.status) == ([42], Task.Status.QUEUED)
+
+
+@pytest.mark.django_db
+def test_eager_mode_runs_inline(settings):
+    settings.TASKS_ALWAYS_EAGER = True
+    record.delay("now")
+
+    assert calls == ["now"]
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_worker_runs_due_tasks_and_deletes_them():
+    record.delay(1)
+    record.delay(2)
+    record.enqueue(args=[3], run_at=timezone.now() + timedelta(hours=1))
+
+    assert work("test", threading.Event(), burst=True) == 2
+    assert calls == [1, 2]
+    assert list(Task.objects.values_list("args", flat=True)) == [[3]]
+
+
+@pytest.mark.django_db
+def test_worker_survives_database_errors(monkeypatch):
+    failures = [OperationalError("database is locked")]
+
+    def flaky_claim(name):
+        if failures:
+            raise failures.pop()
+        return claim(name)
+
+    monkeypatch.setattr(worker, "claim", flaky_claim)
+    record.delay(1)
+
+    assert work("test", threading.Event(), poll_interval=0.01, burst=True) == 1
+    assert calls == [1]
+
+
+@pytest.mark.django_db
+def test_a_task_is_claimed_once():
+    record.delay(1)
+
+    assert len(claim("a")) == 1
+    assert claim("b") == []
+
+
+@pytest.mark.django_db
+def test_failures_are_retried_with_backoff_then_marked_failed():
+    queued = explode.delay()
+
+    execute(claim("test")[0])
+    queued.refresh_from_db()
+    assert queued.status == Task.Status.QUEUED
+    assert queued.run_at > timezone.now() + timedelta(seconds=5)
+    assert "ValueError: boom" in queued.last_error
+
+    Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+    execute(claim("test")[0])
+    queued.refresh_from_db()
+    assert (queued.status, queued.attempts) == (Task.Status.FAILED, 2)
+
+
+@pytest.mark.django_db
+def test_tasks_of_dead_workers_are_requeued():
+    queued = record.delay(1)
+    claim("dead")
+    Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+    assert requeue_stale() == 1
+    assert len(claim("alive")) == 1
+
+
+@pytest.mark.django_db
+def test_email_confirmation_is_sent_by_the_worker(client):
+    user = User.objects.create_user("reader", "reader@example.com", "secret")
+    client.force_login(user)
+
+    response = client.get(reverse("profile-emailverify"))
+    assert response.status_code == 302
+    assert len(mail.outbox) == 0
+
+    work("test", threading.Event(), burst=True)
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == ["reader@example.com"]
+    assert "http://testserver/" in mail.outbox[0].body
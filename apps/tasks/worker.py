@@ -0,0 +1,107 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.db import DatabaseError, close_old_connections, connection, connections
+
+from .queue import claim, execute, lock_timeout, requeue_stale
+
+logger = logging.getLogger(__name__)
+
+# Longest wait after repeated database errors, in seconds
+MAX_ERROR_BACKOFF = 60
+
+
+def worker_name(thread=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{thread}'
+
+
+def work(name, stop, poll_interval=1.0, burst=False):
+    """
+    Claim and run tasks one at a time until `stop` is set.
+
+    With `burst`, return as soon as no task is due instead of polling. Returns the number of tasks run.
+    """
+    count = errors = 0
+    try:
+        while not stop.is_set():
+            try:
+                close_old_connections()
+                tasks = claim(name)
+                if not tasks:
+                    if burst:
+                        break
+                    stop.wait(poll_interval)
+                    continue
+                for task in tasks:
+                    execute(task)
+                    count += 1
+                errors = 0
+            except DatabaseError:
+                # E.g. SQLite's "database is locked": the thread lives on, on a fresh connection. A task
+                # whose status could not be written stays running and is requeued once its lock expires
+                errors += 1
+                logger.exception('Worker %s hit a database error, retrying', name)
+                connection.close()
+                stop.wait(min(poll_interval * 2 ** errors, MAX_ERROR_BACKOFF))
+    finally:
+        connection.close()
+    return count
+
+
+def run_worker(threads=1, poll_interval=1.0, burst=False):
+    """Run `threads` worker threads in this process until SIGINT/SIGTERM (or, with `burst`, until idle)."""
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+
+    requeue_stale()
+    pool = [
+        threading.Thread(target=work, args=(worker_name(i), stop, poll_interval, burst), daemon=True)
+        for i in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    logger.info('Worker %s started with %s thread(s)', worker_name(), threads)
+
+    # Meanwhile the main thread puts back the tasks of workers that died elsewhere
+    check_every = 1.0 if burst else lock_timeout().total_seconds() / 2
+    while any(thread.is_alive() for thread in pool) and not stop.wait(check_every):
+        try:
+            close_old_connections()
+            requeue_stale()
+        except DatabaseError:
+            logger.exception('Worker %s could not requeue stale tasks', worker_name())
+            connection.close()
+    for thread in pool:
+        thread.join()
+    connection.close()
+
+
+def run_workers(processes=1, threads=1, poll_interval=1.0, burst=False):
+    """Fork `processes` worker processes of `threads` threads each, and wait for them."""
+    if processes <= 1:
+        run_worker(threads, poll_interval, burst)
+        return
+
+    # Children must not share the parent's database connections
+    connections.close_all()
+    children = [
+        multiprocessing.Process(target=run_worker, args=(threads, poll_interval, burst), daemon=False)
+        for _ in range(processes)
+    ]
+    for child in children:
+        child.start()
+
+    def forward(signum, frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, forward)
+    for child in children:
+        child.join()
@@ -0,0 +1,44 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.templatetags.static import static
+from django.utils.functional import SimpleLazyObject
+
+from .models import Profile
+
+# What templates/includes/header.html shows of the logged-in user, cached per user so pages do not
+# query the profile; apps/users/signals.py forgets the entry when the user or their profile changes.
+HeaderData = namedtuple("HeaderData", ["name", "avatar"])
+
+HEADER_KEY = "users:header:{}"
+
+
+def load_header_data(user):
+    try:
+        profile = user.profile
+    except Profile.DoesNotExist:
+        return HeaderData(name=user.username, avatar=static("images/avatar.svg")), None
+    data = HeaderData(name=profile.name, avatar=profile.avatar_thumbnail)
+    # Until the thumbnail derivative exists the full avatar is shown; look again soon
+    timeout = None if not profile.image or data.avatar != profile.avatar else 60
+    return data, timeout
+
+
+def header_data(user):
+    key = HEADER_KEY.format(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data, timeout = load_header_data(user)
+        cache.set(key, data, timeout)
+    return data
+
+
+def forget_header_data(user_id):
+    cache.delete(HEADER_KEY.format(user_id))
+
+
+def header(request):
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {"header_user": SimpleLazyObject(lambda: header_data(user))}
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.templatetags.static import static
 
+from core.images import derivative_name, derivative_widths, derivatives_ready, srcset
+
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -22,8 +24,17 @@ class Profile(models.Model):
 
     @property
     def avatar(self):
-        try:
-            avatar = self.image.url
-        except:
-            avatar = static("images/avatar.svg")
-        return avatar
+        if self.image:
+            return self.image.url
+        return static("images/avatar.svg")
+
+    @property
+    def avatar_srcset(self):
+        return srcset(self.image)
+
+    @property
+    def avatar_thumbnail(self):
+        # Smallest derivative for tiny renderings such as the header, once it exists
+        if self.image and derivatives_ready(self.image):
+            return self.image.storage.url(derivative_name(self.image.name, derivative_widths()[0], "webp"))
+        return self.avatar
@@ -1,8 +1,12 @@
 from allauth.account.models import EmailAddress
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from core.images import schedule_derivatives
+from core.sitemaps import schedule_refresh as schedule_sitemap_refresh
+
+from .context_processors import forget_header_data
 from .models import Profile
 
 
@@ -34,3 +38,27 @@ def user_postsave(sender, instance, created, **kwargs):
 def user_presave(sender, instance, **kwargs):
     if instance.username:
         instance.username = instance.username.lower()
+
+
+@receiver(post_save, sender=Profile)
+def profile_postsave(sender, instance, **kwargs):
+    forget_header_data(instance.user_id)
+    schedule_derivatives(instance.image)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Profile)
+def header_data_changed(sender, instance, **kwargs):
+    # The header shows the display name, falling back to the username
+    forget_header_data(instance.pk if sender is User else instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_listing_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # Public profiles are in the sitemaps; logins only touch last_login
+    if sender is User and not created and update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    schedule_sitemap_refresh()
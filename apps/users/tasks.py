@@ -0,0 +1,41 @@
+from allauth.account.utils import send_email_confirmation
+from allauth.core.context import request_context
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpRequest
+
+from apps.tasks.queue import task
+
+
+class WorkerRequest(HttpRequest):
+    """A bare POST to `host`, standing in for the view's request where allauth needs one."""
+
+    def __init__(self, host, secure):
+        super().__init__()
+        self.method = "POST"
+        self.path = self.path_info = "/"
+        self.META.update(HTTP_HOST=host, REMOTE_ADDR="127.0.0.1")
+        self.secure = secure
+
+    def _get_scheme(self):
+        return "https" if self.secure else "http"
+
+
+@task
+def send_confirmation_email(user_id, host, secure):
+    """
+    Send the allauth confirmation email of `user_id` from a worker.
+
+    allauth builds the confirmation link and the site name from a request, so a request to the
+    same host is rebuilt here (as AccountMiddleware would expose it); the flash message allauth adds
+    to it is dropped.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    # A POST, so allauth applies its per-address cooldown as it would have in the view
+    request = WorkerRequest(host, secure)
+    request.user = user
+    request._messages = CookieStorage(request)
+    with request_context(request):
+        send_email_confirmation(request, user)
@@ -1,3 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from apps.users.context_processors import header_data
+
+
+class HeaderDataTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("reader", "reader@example.com", "secret")
+        self.client.force_login(self.user)
+
+    def profile_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        return [query["sql"] for query in queries if "users_profile" in query["sql"]]
+
+    def test_header_does_not_query_the_profile_once_cached(self):
+        self.assertEqual(len(self.profile_queries()), 1)
+        self.assertEqual(self.profile_queries(), [])
+
+    def test_profile_changes_refresh_the_header(self):
+        self.assertEqual(header_data(self.user).name, "reader")
+
+        self.user.profile.displayname = "Reader"
+        self.user.profile.save()
+
+        response = self.client.get("/")
+        self.assertContains(response, "Reader")
+        self.assertEqual(header_data(self.user).name, "Reader")
+
+    def test_default_avatar_without_an_image(self):
+        self.assertEqual(self.user.profile.avatar, "/static/images/avatar.svg")
+        self.assertEqual(header_data(self.user).avatar, "/static/images/avatar.svg")
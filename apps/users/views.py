@@ -1,4 +1,3 @@
-from allauth.account.utils import send_email_confirmation
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.contrib.auth.models import User
@@ -7,6 +6,12 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
 from .forms import ProfileForm, EmailForm
+from .tasks import send_confirmation_email
+
+
+def queue_email_confirmation(request):
+    send_confirmation_email.delay(request.user.id, request.get_host(), request.is_secure())
+    messages.info(request, f"Confirmation e-mail sent to {request.user.email}.")
 
 
 def profile_view(request, username=None):
@@ -65,8 +70,8 @@ def profile_emailchange(request):
 
             # Then Signal updates emailaddress and set verified to False
 
-            # Then send confirmation email
-            send_email_confirmation(request, request.user)
+            # Then send confirmation email, from a worker
+            queue_email_confirmation(request)
 
             return redirect("profile-settings")
         else:
@@ -78,7 +83,7 @@ def profile_emailchange(request):
 
 @login_required
 def profile_emailverify(request):
-    send_email_confirmation(request, request.user)
+    queue_email_confirmation(request)
     return redirect("profile-settings")
 
 
@@ -0,0 +1,16 @@
+"""
+Benchmarks for the blog. Run the scripts as modules from the project root, e.g.::
+
+    python -m benchmarks.explain_indexes --posts 50000
+    python -m benchmarks.replay --requests 2000 --output results.json
+    python -m benchmarks.asgi_vs_wsgi --concurrency 1 8 32
+"""
+import os
+
+
+def setup_django():
+    """Configure Django for a benchmark script run outside manage.py."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
@@ -0,0 +1,201 @@
+"""
+Compare the throughput of the blog read views under concurrent load: the sync views behind WSGI,
+the same sync views behind ASGI, and the async views behind ASGI (see core/asgi.py).
+
+    python -m benchmarks.asgi_vs_wsgi --posts 2000 --requests 2000 --concurrency 1 8 32
+
+Each mode runs in its own process against a throwaway test database, seeded identically. Requests
+are driven straight into Django's handlers, from a thread pool for WSGI (like a threaded WSGI server)
+and from asyncio tasks for ASGI (like uvicorn), so the figures compare the application side only.
+Put a real server and a load generator such as `wrk` in front of it for end-to-end numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks import setup_django
+
+# mode -> BLOG_ASYNC_VIEWS
+MODES = {"wsgi": False, "asgi-sync": False, "asgi": True}
+
+# Share of each read view in the request mix
+MIX = (("post_list", 0.4), ("post_detail", 0.4), ("category", 0.1), ("tag", 0.1))
+
+
+def request_paths(count, seed=7):
+    from apps.blog.models import Category, Post, Tag
+
+    rng = random.Random(seed)
+    slugs = list(Post.objects.published().values_list("slug", flat=True))
+    categories = list(Category.objects.values_list("slug", flat=True))
+    tags = list(Tag.objects.values_list("slug", flat=True))
+    paths = []
+    for _ in range(count):
+        view = rng.choices([name for name, _ in MIX], weights=[weight for _, weight in MIX])[0]
+        if view == "post_list":
+            paths.append(f"/blog/?page={rng.randint(1, 5)}")
+        elif view == "post_detail":
+            paths.append(f"/blog/post/{rng.choice(slugs)}/")
+        elif view == "category":
+            paths.append(f"/blog/category/{rng.choice(categories)}/")
+        else:
+            paths.append(f"/blog/tag/{rng.choice(tags)}/")
+    return paths
+
+
+def wsgi_environ(path):
+    path_info, _, query = path.partition("?")
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path_info,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "localhost",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": sys.stderr,
+    }
+
+
+def run_wsgi(paths, concurrency):
+    from django.core.handlers.wsgi import WSGIHandler
+
+    application = WSGIHandler()
+
+    def call(path):
+        statuses = []
+        start = time.perf_counter()
+        body = application(wsgi_environ(path), lambda status, headers, exc_info=None: statuses.append(status))
+        b"".join(body)
+        body.close()  # Sends request_finished, like a WSGI server would
+        return time.perf_counter() - start, statuses[0].startswith("200")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(call, paths))
+
+
+def asgi_scope(path):
+    path_info, _, query = path.partition("?")
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path_info,
+        "raw_path": path_info.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+
+
+async def run_asgi(paths, concurrency):
+    from django.core.handlers.asgi import ASGIHandler
+
+    application = ASGIHandler()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def call(path):
+        body_sent = False
+        statuses = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # The client never disconnects
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        async with slots:
+            start = time.perf_counter()
+            await application(asgi_scope(path), receive, send)
+            return time.perf_counter() - start, statuses[0] == 200
+
+    return await asyncio.gather(*(call(path) for path in paths))
+
+
+def measure(mode, paths, concurrency):
+    start = time.perf_counter()
+    if mode == "wsgi":
+        results = run_wsgi(paths, concurrency)
+    else:
+        results = asyncio.run(run_asgi(paths, concurrency))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    centiles = statistics.quantiles(latencies, n=100)
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": sum(1 for _, ok in results if not ok),
+        "rps": len(results) / elapsed,
+        "p50_ms": centiles[49],
+        "p95_ms": centiles[94],
+        "p99_ms": centiles[98],
+    }
+
+
+def run_mode(args):
+    """Child process: seed, warm up, then measure every concurrency level of one mode."""
+    setup_django()
+    from django.db import connection
+
+    from benchmarks.seed import finish_corpus, seed_corpus
+
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    seed_corpus(posts=args.posts, comments_per_post=args.comments_per_post)
+    finish_corpus()
+
+    paths = request_paths(args.requests)
+    measure(args.mode, paths[:50], 4)  # Warm up caches, Markdown instances and templates
+    for concurrency in args.concurrency:
+        print(json.dumps(measure(args.mode, paths, concurrency)), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    print(f"{'mode':<10} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode, async_views in MODES.items():
+        env = dict(os.environ, DEBUG="False", BLOG_ASYNC_VIEWS=str(async_views))
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.asgi_vs_wsgi", "--mode", mode, *sys.argv[1:]],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        for line in child.stdout.splitlines():
+            row = json.loads(line)
+            print(
+                f"{row['mode']:<10} {row['concurrency']:>5} {row['rps']:>9.1f} {row['p50_ms']:>8.1f} "
+                f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
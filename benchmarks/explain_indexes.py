@@ -0,0 +1,87 @@
+"""
+Seed a large corpus and compare query plans and timings of the blog's hot queries with and without
+the listing indexes (see the indexes in Post.Meta and Comment.Meta).
+
+    python -m benchmarks.explain_indexes --posts 50000 --repeat 20
+
+Runs against a throwaway test database, never against the configured one.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django
+
+INDEX_NAMES = ("blog_post_status_idx", "blog_post_created_idx", "blog_comment_post_created_idx")
+
+
+def query_shapes():
+    from apps.blog.models import Category, Comment, Post
+    from apps.blog.pagination import LISTING_ORDER
+
+    listing = Post.objects.published().for_listing().order_by(*LISTING_ORDER)
+    middle = list(listing.values_list("published_at", flat=True)[:500])[-1]
+    post_id = Comment.objects.values_list("post_id", flat=True).first()
+    category = Category.objects.first()
+
+    return {
+        "post_list (page 1)": listing[:10],
+        "post_list (keyset)": listing.filter(published_at__lt=middle)[:10],
+        "post_list_by_category": category.posts.published().order_by(*LISTING_ORDER)[:10],
+        "post_detail comments": Comment.objects.filter(post_id=post_id).order_by("created_at")[:50],
+        "admin changelist": Post.objects.order_by("-created_at")[:100],
+    }
+
+
+def set_indexes(enabled):
+    from django.db import connection
+
+    from apps.blog.models import Comment, Post
+
+    indexes = [(model, index) for model in (Post, Comment) for index in model._meta.indexes if index.name in INDEX_NAMES]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            if enabled:
+                editor.add_index(model, index)
+            else:
+                editor.remove_index(model, index)
+
+
+def report(label, repeat):
+    print(f"\n=== {label} ===")
+    for name, queryset in query_shapes().items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset._chain())
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"\n-- {name}: median {statistics.median(timings):.2f} ms over {repeat} runs")
+        print(queryset.explain())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from benchmarks.seed import seed_corpus
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        seed_corpus(posts=args.posts, comments_per_post=args.comments_per_post)
+        set_indexes(enabled=False)
+        report("without listing indexes", args.repeat)
+        set_indexes(enabled=True)
+        report("with listing indexes", args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
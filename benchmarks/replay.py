@@ -0,0 +1,284 @@
+"""
+Replay a weighted request mix against the blog and report latency, queries and allocations per view.
+
+    python -m benchmarks.replay --posts 2000 --requests 2000 --output results.json
+    python -m benchmarks.replay --baseline results.json      # exits 1 when a view regressed
+    python -m benchmarks.replay --base-url http://localhost:8000   # a running server, latency only
+
+The mix (benchmarks/request_mix.jsonl by default) holds one JSON object per line: a view `name`, a
+`path` whose placeholders ({post}, {category}, {tag}, {page}, {word}) are filled from the corpus, a
+relative `weight`, and `"login": true` for requests made by a logged-in reader.
+
+In-process runs go through Django's test client against a throwaway test database seeded with
+benchmarks.seed. Queries are counted on every request; allocations are measured with tracemalloc on
+a separate, smaller pass so that tracing does not skew the timings. Against a server
+(`--base-url`), the corpus is read from the configured database (see `python -m benchmarks.seed`)
+and only latencies are reported.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import setup_django
+
+DEFAULT_MIX = Path(__file__).with_name("request_mix.jsonl")
+RESULTS_FORMAT = 1
+
+# Below this many requests a view's p95 is too noisy to call a regression
+MIN_REQUESTS_FOR_LATENCY = 20
+
+
+def load_mix(path):
+    with open(path) as lines:
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+def corpus_values():
+    """Values for the mix placeholders, taken from the database the requests will hit."""
+    from django.conf import settings
+
+    from apps.blog.models import Category, Post, Tag
+    from benchmarks.seed import WORDS
+
+    per_page = getattr(settings, "BLOG_POSTS_PER_PAGE", 10)
+    published = Post.objects.published()
+    return {
+        "post": list(published.values_list("slug", flat=True)[:5000]),
+        "category": list(Category.objects.values_list("slug", flat=True)),
+        "tag": list(Tag.objects.values_list("slug", flat=True)),
+        "page": [str(page) for page in range(2, max(2, min(20, published.count() // per_page)) + 1)],
+        "word": WORDS,
+    }
+
+
+def plan_requests(mix, count, values, seed=7):
+    """`count` (name, path, login) requests drawn from the mix with its weights."""
+    rng = random.Random(seed)
+    entries = rng.choices(mix, weights=[entry.get("weight", 1) for entry in mix], k=count)
+    return [
+        (
+            entry["name"],
+            entry["path"].format(**{key: rng.choice(choices) for key, choices in values.items() if choices}),
+            entry.get("login", False),
+        )
+        for entry in entries
+    ]
+
+
+class ClientTarget:
+    """Requests through Django's test client, counting the queries of each."""
+
+    def __init__(self):
+        from django.contrib.auth.models import User
+        from django.test import Client
+
+        self.anonymous = Client()
+        self.reader = Client()
+        self.reader.force_login(User.objects.create_user("bench-reader", "bench-reader@example.com", "bench"))
+
+    def fetch(self, path, login):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = (self.reader if login else self.anonymous).get(path)
+        return response.status_code, len(queries)
+
+
+class HttpTarget:
+    """Requests to a running server; logged-in entries of the mix are skipped."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def fetch(self, path, login):
+        try:
+            with urllib.request.urlopen(self.base_url + path) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+
+def replay(target, requests):
+    samples = defaultdict(lambda: {"latencies": [], "queries": [], "errors": 0})
+    for name, path, login in requests:
+        start = time.perf_counter()
+        status, queries = target.fetch(path, login)
+        sample = samples[name]
+        sample["latencies"].append((time.perf_counter() - start) * 1000)
+        if queries is not None:
+            sample["queries"].append(queries)
+        if status != 200:
+            sample["errors"] += 1
+    return samples
+
+
+def allocations(target, requests, per_view):
+    """Peak KiB allocated while serving up to `per_view` requests of each view, traced by tracemalloc."""
+    peaks = defaultdict(list)
+    tracemalloc.start()
+    try:
+        for name, path, login in requests:
+            if len(peaks[name]) >= per_view:
+                continue
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            target.fetch(path, login)
+            peaks[name].append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples, peaks):
+    views = {}
+    for name, sample in sorted(samples.items()):
+        latencies, queries = sample["latencies"], sample["queries"]
+        views[name] = {
+            "requests": len(latencies),
+            "errors": sample["errors"],
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "queries_max": max(queries) if queries else None,
+            "alloc_peak_kib": round(percentile(peaks[name], 50), 1) if peaks.get(name) else None,
+        }
+    return views
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(views, baseline, tolerance):
+    """Regressions of `views` against a baseline results file: slower p95 or more queries."""
+    regressions = []
+    for name, current in views.items():
+        before = baseline["views"].get(name)
+        if before is None:
+            continue
+        enough = min(current["requests"], before["requests"]) >= MIN_REQUESTS_FOR_LATENCY
+        if enough and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if None not in (current["queries_mean"], before["queries_mean"]):
+            if current["queries_mean"] > before["queries_mean"] + 0.5:
+                regressions.append(f"{name}: queries {before['queries_mean']} -> {current['queries_mean']}")
+    return regressions
+
+
+def print_table(views, baseline=None):
+    print(f"{'view':<24} {'reqs':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'alloc KiB':>10} {'p95 vs base':>12}")
+    for name, view in views.items():
+        before = (baseline or {}).get("views", {}).get(name)
+        delta = f"{(view['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}%" if before and before["p95_ms"] else ""
+        queries = "-" if view["queries_mean"] is None else view["queries_mean"]
+        alloc = "-" if view["alloc_peak_kib"] is None else view["alloc_peak_kib"]
+        print(
+            f"{name:<24} {view['requests']:>5} {view['p50_ms']:>8.1f} {view['p95_ms']:>8.1f} "
+            f"{view['p99_ms']:>8.1f} {queries:>8} {alloc:>10} {delta:>12}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Request mix, JSON lines.")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--alloc-samples", type=int, default=20, help="Requests per view traced for allocations.")
+    parser.add_argument("--base-url", help="Replay against a running server instead of in-process.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Results file to compare with; exits 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown against the baseline.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DEBUG", "False")
+    setup_django()
+    from django.db import connection
+
+    from benchmarks.seed import finish_corpus, seed_corpus
+
+    mix = load_mix(args.mix)
+    old_name = None
+    if args.base_url:
+        target = HttpTarget(args.base_url)
+        mix = [entry for entry in mix if not entry.get("login")]
+    else:
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        seed_corpus(
+            posts=args.posts, comments_per_post=args.comments_per_post, users=args.users, tags=args.tags, seed=args.seed
+        )
+        finish_corpus()
+        target = ClientTarget()
+
+    try:
+        requests = plan_requests(mix, args.requests, corpus_values(), seed=args.seed)
+        replay(target, requests[:50])  # Warm up connections, templates and Markdown instances
+        samples = replay(target, requests)
+        peaks = allocations(target, requests, args.alloc_samples) if not args.base_url else {}
+    finally:
+        if old_name is not None:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    results = {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "target": args.base_url or "test-client",
+            "mix": Path(args.mix).name,
+            "requests": args.requests,
+            "posts": None if args.base_url else args.posts,
+            "seed": args.seed,
+        },
+        "views": summarize(samples, peaks),
+    }
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_table(results["views"], baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if baseline:
+        if baseline.get("format") != RESULTS_FORMAT:
+            parser.error(f"{args.baseline} is not a results file of format {RESULTS_FORMAT}")
+        regressions = compare(results["views"], baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Synthetic corpus for the benchmarks. The scripts seed a throwaway test database themselves; to load
+a development server for `benchmarks.replay --base-url`, seed the configured database with::
+
+    python -m benchmarks.seed --posts 5000
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from benchmarks import setup_django
+
+WORDS = (
+    "django python markdown cache query index render template request latency "
+    "database migration signal queryset pagination feed sitemap search worker"
+).split()
+
+
+def paragraph(rng, words=60):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def markdown_document(rng, sections=None):
+    """A post body using the Markdown the blog renders: headings, emphasis, links, lists, code, tables."""
+    blocks = []
+    for section in range(sections or rng.randint(2, 6)):
+        blocks.append(f"## {paragraph(rng, words=rng.randint(2, 5))[:-1]}")
+        for _ in range(rng.randint(1, 3)):
+            text = paragraph(rng, words=rng.randint(30, 90)).split(" ")
+            text[rng.randrange(len(text))] = f"**{rng.choice(WORDS)}**"
+            text[rng.randrange(len(text))] = f"[{rng.choice(WORDS)}](https://example.com/{rng.choice(WORDS)})"
+            blocks.append(" ".join(text))
+        extra = rng.random()
+        if extra < 0.3:
+            blocks.append("\n".join(f"- {paragraph(rng, words=rng.randint(3, 10))}" for _ in range(rng.randint(2, 6))))
+        elif extra < 0.5:
+            code = "\n".join(f"    {rng.choice(WORDS)} = {rng.choice(WORDS)}({rng.choice(WORDS)})" for _ in range(5))
+            blocks.append(f"    :::python\n{code}")
+        elif extra < 0.6:
+            rows = [f"| {rng.choice(WORDS)} | {rng.randint(1, 999)} |" for _ in range(rng.randint(2, 8))]
+            blocks.append("\n".join(["| name | value |", "| --- | --- |", *rows]))
+        elif extra < 0.7:
+            blocks.append(f"!!! note\n    {paragraph(rng, words=20)}")
+    return "\n\n".join(blocks)
+
+
+def seed_corpus(posts=1000, comments_per_post=5, users=20, categories=20, tags=50, draft_ratio=0.1, seed=42):
+    """
+    Bulk-insert a synthetic corpus and return the created posts.
+
+    Rows are written with `bulk_create`, so `Post.save()` side effects (rendering, slugs) are skipped;
+    the benchmarks only need realistic row counts and value distributions. `finish_corpus` fills in
+    what the signals would have maintained, for benchmarks that serve pages.
+    """
+    from django.contrib.auth.models import User
+
+    from apps.blog.models import Category, Comment, Post, Tag
+
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    authors = User.objects.bulk_create(
+        [User(username=f"bench-user-{i}", email=f"bench-user-{i}@example.com") for i in range(users)]
+    )
+    category_rows = Category.objects.bulk_create(
+        [Category(name=f"Bench category {i}", slug=f"bench-category-{i}") for i in range(categories)]
+    )
+    tag_rows = Tag.objects.bulk_create([Tag(name=f"bench-tag-{i}", slug=f"bench-tag-{i}") for i in range(tags)])
+
+    post_rows = []
+    for i in range(posts):
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 3))
+        published_at = None if rng.random() < draft_ratio else created_at + timedelta(minutes=rng.randint(0, 600))
+        post_rows.append(Post(
+            title=f"Bench post {i}",
+            slug=f"bench-post-{i}",
+            author=rng.choice(authors),
+            content=markdown_document(rng),
+            created_at=created_at,
+            published_at=published_at,
+            status=Post.status_for(published_at),
+        ))
+    post_rows = Post.objects.bulk_create(post_rows, batch_size=1000)
+
+    Category.posts.through.objects.bulk_create(
+        [Category.posts.through(post_id=post.pk, category_id=rng.choice(category_rows).pk) for post in post_rows],
+        batch_size=1000,
+    )
+    Tag.posts.through.objects.bulk_create(
+        [
+            Tag.posts.through(post_id=post.pk, tag_id=tag.pk)
+            for post in post_rows
+            for tag in rng.sample(tag_rows, k=min(3, len(tag_rows)))
+        ],
+        batch_size=1000,
+    )
+    Comment.objects.bulk_create(
+        [
+            Comment(
+                post=post,
+                author=rng.choice(authors).username,
+                content=paragraph(rng, words=20),
+                created_at=post.created_at + timedelta(minutes=rng.randint(1, 10000)),
+            )
+            for post in post_rows
+            for _ in range(rng.randint(0, comments_per_post * 2))
+        ],
+        batch_size=1000,
+    )
+    return post_rows
+
+
+def finish_corpus():
+    """Fill in what saving the seeded rows would have stored: rendered HTML, counters, search index, related posts."""
+    from django.db.models import Count, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+
+    from apps.blog.counters import rebuild_post_counts
+    from apps.blog.models import Comment, Post
+    from apps.blog.related import rebuild_related_posts
+    from apps.blog.search import rebuild_search_index
+
+    posts = list(Post.objects.only("id", "content", *Post.RENDER_FIELDS))
+    for post in posts:
+        post.render_content(force=True)
+    Post.objects.bulk_update(posts, Post.RENDER_FIELDS, batch_size=500)
+
+    counts = Comment.objects.filter(post=OuterRef("pk")).order_by().values("post").annotate(n=Count("pk")).values("n")
+    Post.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+    rebuild_post_counts()
+
+    rebuild_search_index()
+    rebuild_related_posts()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    if not settings.DEBUG:
+        parser.error("refusing to seed a database with DEBUG off")
+    seed_corpus(posts=args.posts, comments_per_post=args.comments_per_post, users=args.users, tags=args.tags)
+    finish_corpus()
+    print(f"Seeded {args.posts} posts into {settings.DATABASES['default']['NAME']}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def enforce_view_budgets(settings):
+    # A view going over its query budget (INSTRUMENTATION_BUDGETS) fails the test that requested it
+    settings.INSTRUMENTATION_BUDGET_ACTION = "raise"
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    # Each test process gets its own cache instead of the shared one in settings.py
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
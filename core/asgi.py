@@ -3,6 +3,21 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served through ASGI, the blog's read views (post list, post detail, category and tag listings) are
+their async versions from apps/blog/async_views.py; set BLOG_ASYNC_VIEWS=False to keep the sync
+ones. For production, run one uvicorn worker per CPU core::
+
+    uvicorn core.asgi:application --host 0.0.0.0 --port 8000 \\
+        --workers 4 --loop uvloop --http httptools --limit-concurrency 200 --no-access-log
+
+- ``--workers``: the event loop of a worker uses one core; Markdown renders on MARKDOWN_RENDER_THREADS
+  extra threads per worker.
+- ``--limit-concurrency``: every in-flight request holds a sync thread and a database connection
+  (templates and sessions still use the sync ORM), so cap it below what the database accepts.
+- ``BLOG_PAGE_CACHE=True`` serves anonymous pages without touching the views at all.
+
+``python -m benchmarks.asgi_vs_wsgi`` compares this setup with the sync views under WSGI.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -12,5 +27,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('BLOG_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
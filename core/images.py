@@ -0,0 +1,112 @@
+"""
+Resized WebP/JPEG derivatives of uploaded images.
+
+Derivatives are written next to the original (``avatars/me.jpg`` -> ``avatars/me.jpg.320w.webp``) by a
+background task (`manage.py runworker`), so the request never waits for Pillow. Templates use
+`srcset()` and fall back to the original until the derivatives exist.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete
+from PIL import Image, ImageOps
+
+from apps.tasks.queue import task
+
+# extension -> (Pillow format, save options)
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+READY_KEY = "images:ready:v2:{}"  # v2: derivative names keep the original's extension
+
+
+def derivative_widths():
+    return tuple(getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", (64, 320, 640, 1280)))
+
+
+def derivative_name(name, width, ext):
+    # The whole original name, extension included: photo.png and photo.jpg side by side keep their own
+    return f"{name}.{width}w.{ext}"
+
+
+def derivative_names(name):
+    return [derivative_name(name, width, ext) for width in derivative_widths() for ext in FORMATS]
+
+
+def generate_derivatives(name, storage):
+    """Write every width/format derivative of the image `name`. Returns the names written."""
+    with storage.open(name, "rb") as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    written = []
+    for width in derivative_widths():
+        resized = image.copy()
+        # Never upscale: small originals get same-sized derivatives so every srcset entry exists
+        resized.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+        for ext, (image_format, options) in FORMATS.items():
+            if image_format == "JPEG":
+                target = resized.convert("RGB")
+            else:
+                target = resized if resized.mode in ("RGB", "RGBA") else resized.convert("RGBA")
+            buffer = BytesIO()
+            target.save(buffer, image_format, **options)
+            path = derivative_name(name, width, ext)
+            if storage.exists(path):
+                storage.delete(path)
+            written.append(storage.save(path, ContentFile(buffer.getvalue())))
+    cache.set(READY_KEY.format(name), True, None)
+    return written
+
+
+def delete_derivatives(name, storage):
+    for path in derivative_names(name):
+        if storage.exists(path):
+            storage.delete(path)
+    cache.delete(READY_KEY.format(name))
+
+
+def derivatives_ready(field_file):
+    key = READY_KEY.format(field_file.name)
+    ready = cache.get(key)
+    if ready is None:
+        ready = field_file.storage.exists(derivative_names(field_file.name)[-1])
+        # A missing derivative may be in the making, look again soon
+        cache.set(key, ready, None if ready else 60)
+    return ready
+
+
+@task(max_attempts=3)
+def generate_image_derivatives(name):
+    # Every image field of the project uses the default storage
+    generate_derivatives(name, default_storage)
+
+
+def schedule_derivatives(field_file):
+    """Queue the generation of the derivatives of `field_file`."""
+    if not field_file or derivatives_ready(field_file):
+        return
+    generate_image_derivatives.delay(field_file.name)
+
+
+def srcset(field_file, ext="webp"):
+    """The `srcset` value for `field_file`, or "" while its derivatives do not exist yet."""
+    if not field_file or not derivatives_ready(field_file):
+        return ""
+    return ", ".join(
+        f"{field_file.storage.url(derivative_name(field_file.name, width, ext))} {width}w"
+        for width in derivative_widths()
+    )
+
+
+@receiver(cleanup_post_delete)
+def original_deleted(sender, file_name, file, success, **kwargs):
+    # django_cleanup removed a replaced or orphaned original: its derivatives go with it
+    if success and file_name:
+        delete_derivatives(file_name, file.storage)
@@ -0,0 +1,180 @@
+"""
+Per-request instrumentation: SQL query count and time, template render time and Markdown render time.
+
+`InstrumentationMiddleware` collects the figures of each request, logs them (logger
+``core.instrumentation``), adds a ``Server-Timing`` header when `INSTRUMENTATION_SERVER_TIMING` is on,
+and checks them against the view's budget in `INSTRUMENTATION_BUDGETS`, e.g.::
+
+    INSTRUMENTATION_BUDGETS = {"blog:post_list": {"queries": 10, "db_ms": 50, "total_ms": 200}}
+
+Budgets apply to GET and HEAD requests, the read paths. A view over budget logs a warning, or raises
+`BudgetExceeded` with `INSTRUMENTATION_BUDGET_ACTION = "raise"` (as the test suite does).
+
+Template time comes from `TimedDjangoTemplates`, the template backend; Markdown time from the
+`timed("markdown")` blocks in the markdown filter and `Post.get_markdown`. Template time includes the
+Markdown rendered by templates.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# The metrics of the request being served; copied into the threads sync_to_async runs code in
+_current = ContextVar("request_metrics", default=None)
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    __slots__ = ("started", "queries", "db", "template", "markdown")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.markdown = 0.0
+
+    def as_dict(self):
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "queries": self.queries,
+            "db_ms": round(self.db * 1000, 2),
+            "template_ms": round(self.template * 1000, 2),
+            "markdown_ms": round(self.markdown * 1000, 2),
+        }
+
+
+@contextmanager
+def timed(kind):
+    """Add the time spent in the block to the current request's `kind` ("template" or "markdown")."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, kind, getattr(metrics, kind) + time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db += time.perf_counter() - start
+
+
+def instrument(db_connection):
+    if record_query not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    instrument(connection)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing every top-level render for the instrumentation."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def server_timing(values):
+    return ", ".join([
+        f'db;dur={values["db_ms"]};desc="{values["queries"]} queries"',
+        f'tpl;dur={values["template_ms"]}',
+        f'md;dur={values["markdown_ms"]}',
+        f'total;dur={values["total_ms"]}',
+    ])
+
+
+def over_budget(view_name, values):
+    """The figures of `values` above the budget of `view_name`, as readable strings."""
+    budget = getattr(settings, "INSTRUMENTATION_BUDGETS", {}).get(view_name, {})
+    return [f"{key} {values[key]} > {limit}" for key, limit in budget.items() if values[key] > limit]
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        instrument(connection)
+        token = _current.set(RequestMetrics())
+        try:
+            response = self.get_response(request)
+            return self.finish(request, response, _current.get())
+        finally:
+            _current.reset(token)
+
+    async def __acall__(self, request):
+        token = _current.set(RequestMetrics())
+        try:
+            response = await self.get_response(request)
+            return self.finish(request, response, _current.get())
+        finally:
+            _current.reset(token)
+
+    def finish(self, request, response, metrics):
+        values = metrics.as_dict()
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else None
+
+        if getattr(settings, "INSTRUMENTATION_SERVER_TIMING", False):
+            response["Server-Timing"] = server_timing(values)
+        logger.info(
+            "view=%s method=%s status=%s total_ms=%s queries=%s db_ms=%s template_ms=%s markdown_ms=%s",
+            view_name, request.method, response.status_code, values["total_ms"], values["queries"],
+            values["db_ms"], values["template_ms"], values["markdown_ms"],
+            extra={"view": view_name, "status": response.status_code, **values},
+        )
+
+        exceeded = over_budget(view_name, values) if view_name and request.method in ("GET", "HEAD") else []
+        if exceeded:
+            message = f"{view_name} over budget: {', '.join(exceeded)}"
+            if getattr(settings, "INSTRUMENTATION_BUDGET_ACTION", "warn") == "raise":
+                raise BudgetExceeded(message)
+            logger.warning(message, extra={"view": view_name, **values})
+        return response
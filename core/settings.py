@@ -47,9 +47,11 @@ INSTALLED_APPS = [
     "apps.home",
     "apps.users",
     "apps.blog",
+    "apps.tasks",
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.InstrumentationMiddleware",  # outermost, so it sees every query of the request
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -70,7 +72,7 @@ ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.instrumentation.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -79,6 +81,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "apps.users.context_processors.header",
             ],
         },
     },
@@ -98,6 +101,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/ref/settings/#caches
+# Shared by every process: the web workers, `runworker` and management commands (cron, imports)
+# bump the scope versions cached pages, feeds and the sidebar are keyed on, and comment rate limits
+# are counted here. The file cache is shared by the processes of one host (the app and worker
+# containers mount the same directory). With several hosts use Redis: CACHE_BACKEND=
+# django.core.cache.backends.redis.RedisCache and CACHE_LOCATION=redis://host:6379/0 (`pip install redis`).
+
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": config("CACHE_LOCATION", default=str(BASE_DIR / ".cache")),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -148,3 +167,66 @@ LOGIN_REDIRECT_URL = "/"
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 ACCOUNT_AUTHENTICATION_METHOD = "email"
 ACCOUNT_EMAIL_REQUIRED = True
+
+# Markdown render cache, see apps/blog/rendering.py
+MARKDOWN_CACHE_SIZE = 512  # entries kept in the per-process LRU
+MARKDOWN_CACHE_TIMEOUT = 60 * 60 * 24
+MARKDOWN_RENDER_THREADS = 4  # threads rendering Markdown for the async views
+MARKDOWN_RENDER_PROCESSES = None  # processes rendering bulk re-renders and imports (None: one per CPU)
+
+# Blog listings, see apps/blog/pagination.py
+BLOG_POSTS_PER_PAGE = 10
+BLOG_PAGINATION_MODE = "page"  # or "keyset" to seek on (published_at, id) without OFFSET/COUNT(*)
+BLOG_COMMENTS_PER_PAGE = 20
+BLOG_PAGE_CACHE = config("BLOG_PAGE_CACHE", default=False, cast=bool)  # cache anonymous blog pages, see apps/blog/cache.py
+BLOG_PAGE_CACHE_TIMEOUT = 300
+BLOG_ASYNC_VIEWS = config("BLOG_ASYNC_VIEWS", default=False, cast=bool)  # async read views, on by default under core/asgi.py
+BLOG_WORDS_PER_MINUTE = 200  # reading time stored with each post, rounded up to whole minutes
+BLOG_RELATED_POSTS_STORED = 20  # precomputed related posts kept per post, see apps/blog/related.py
+BLOG_SIDEBAR_SIZE = 10  # top categories and tags by published posts on the post list
+BLOG_SIDEBAR_TIMEOUT = 60 * 60  # the fragment is also dropped whenever the post list changes
+BLOG_FEED_ITEMS = 50  # newest posts per feed, see apps/blog/feeds.py
+BLOG_FEED_MAX_AGE = 60 * 5  # public caching of feeds by clients and proxies
+BLOG_FEED_CACHE_TIMEOUT = 60 * 60  # generated feeds are also dropped whenever their posts change
+BLOG_FEED_CACHE_MAX_SIZE = 1024 * 1024  # larger feeds are streamed on every request instead
+BLOG_COMMENT_RATE_LIMIT = 5  # comments per user (or client address) and window, see apps/blog/ratelimit.py
+BLOG_COMMENT_RATE_WINDOW = 60  # seconds
+BLOG_RATE_LIMIT_CACHE = "default"  # the cache alias counting requests; must be shared between processes (check blog.W001)
+
+# Responsive image derivatives, see core/images.py
+IMAGE_DERIVATIVE_WIDTHS = (64, 320, 640, 1280)
+
+# Background tasks, run by `manage.py runworker`, see apps/tasks/queue.py
+TASKS_ALWAYS_EAGER = config("TASKS_ALWAYS_EAGER", default=False, cast=bool)  # run tasks inline, without a worker
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_BACKOFF = 10  # seconds before the first retry, doubled on every further attempt
+TASKS_RETRY_BACKOFF_MAX = 60 * 60
+TASKS_LOCK_TIMEOUT = 60 * 10  # a task running longer is assumed lost with its worker and queued again
+
+# Sitemaps, see core/sitemaps.py
+SITEMAP_ROOT = BASE_DIR / "sitemaps"
+SITEMAP_BASE_URL = config("SITEMAP_BASE_URL", default="http://localhost:8000")  # scheme and host the sitemaps point at
+SITEMAP_SHARD_SIZE = 50_000  # URLs per file, the protocol's maximum
+SITEMAP_REFRESH_DELAY = 60  # seconds after a publication before the queued refresh runs
+
+# Per-request instrumentation, see core/instrumentation.py
+INSTRUMENTATION_SERVER_TIMING = config("INSTRUMENTATION_SERVER_TIMING", default=DEBUG, cast=bool)  # timings for browser devtools
+INSTRUMENTATION_BUDGET_ACTION = "warn"  # or "raise", as in the tests (conftest.py)
+INSTRUMENTATION_BUDGETS = {
+    "blog:post_list": {"queries": 10},
+    "blog:post_detail": {"queries": 12},
+    "blog:post_comments": {"queries": 8},
+    "blog:post_list_by_category": {"queries": 10},
+    "blog:post_list_by_tag": {"queries": 10},
+    "profile": {"queries": 8},
+    "profile-settings": {"queries": 8},
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core.instrumentation": {"handlers": ["console"], "level": config("INSTRUMENTATION_LOG_LEVEL", default="WARNING")},
+    },
+}
@@ -0,0 +1,190 @@
+"""
+XML sitemaps of the posts, categories, tags and public profiles, written to `SITEMAP_ROOT`.
+
+Each section is split into shards of at most `SITEMAP_SHARD_SIZE` URLs (50,000, the protocol's limit),
+``sitemap-posts-1.xml``, ``sitemap-posts-2.xml``... listed by the index ``sitemap.xml``. Rows are
+read with `values_list().iterator()` and written line by line, so memory use does not grow with the
+corpus. `manage.py write_sitemaps` regenerates the files; publishing or unpublishing posts queues a
+refresh (`schedule_refresh`). The views serve the files; until they exist, they queue a refresh and
+answer 503 Service Unavailable with Retry-After.
+"""
+import itertools
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from apps.tasks.models import Task
+from apps.tasks.queue import task
+
+INDEX_NAME = "sitemap.xml"
+SHARD_NAME = re.compile(r"^sitemap-[a-z]+-\d+\.xml$")
+
+XML_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+# Seconds a client asking before the first generation is told to wait
+RETRY_AFTER = 30
+
+
+def sitemap_root():
+    return Path(getattr(settings, "SITEMAP_ROOT", settings.BASE_DIR / "sitemaps"))
+
+
+def shard_size():
+    return getattr(settings, "SITEMAP_SHARD_SIZE", 50_000)
+
+
+def post_entries():
+    from apps.blog.models import Post
+
+    rows = Post.objects.published().order_by("pk").values_list("slug", "updated_at")
+    for slug, updated_at in rows.iterator(chunk_size=2000):
+        yield reverse("blog:post_detail", args=[slug]), updated_at
+
+
+def category_entries():
+    from apps.blog.models import Category
+
+    for slug in Category.objects.filter(post_count__gt=0).order_by("pk").values_list("slug", flat=True).iterator():
+        yield reverse("blog:post_list_by_category", args=[slug]), None
+
+
+def tag_entries():
+    from apps.blog.models import Tag
+
+    for slug in Tag.objects.filter(post_count__gt=0).order_by("pk").values_list("slug", flat=True).iterator():
+        yield reverse("blog:post_list_by_tag", args=[slug]), None
+
+
+def profile_entries():
+    users = User.objects.filter(is_active=True, profile__isnull=False).order_by("pk")
+    for username in users.values_list("username", flat=True).iterator(chunk_size=2000):
+        yield reverse("profile", args=[username]), None
+
+
+# section -> (location, lastmod) pairs, lastmod may be None
+SECTIONS = {
+    "posts": post_entries,
+    "categories": category_entries,
+    "tags": tag_entries,
+    "profiles": profile_entries,
+}
+
+
+def write_atomically(path, lines):
+    """Write `lines` to a temporary file next to `path`, then move it over `path`."""
+    # A name of its own, so concurrent writers (a request racing the refresh task) never interleave
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    ) as out:
+        try:
+            out.writelines(lines)
+        except BaseException:
+            out.close()
+            os.unlink(out.name)
+            raise
+    os.replace(out.name, path)
+
+
+def urlset(base_url, entries, newest):
+    """The lines of one shard; `newest` ([datetime]) receives the latest lastmod written."""
+    yield XML_HEAD
+    yield f"<urlset {XMLNS}>\n"
+    for location, lastmod in entries:
+        if lastmod is None:
+            yield f"<url><loc>{escape(base_url + location)}</loc></url>\n"
+        else:
+            newest[0] = max(newest[0] or lastmod, lastmod)
+            yield f"<url><loc>{escape(base_url + location)}</loc><lastmod>{lastmod.isoformat()}</lastmod></url>\n"
+    yield "</urlset>\n"
+
+
+def write_sitemaps(base_url=None):
+    """Regenerate every shard and the index. Returns the names of the shards written."""
+    base_url = (base_url or getattr(settings, "SITEMAP_BASE_URL", "http://localhost:8000")).rstrip("/")
+    root = sitemap_root()
+    root.mkdir(parents=True, exist_ok=True)
+
+    shards = []  # (name, lastmod)
+    for section, entries_func in SECTIONS.items():
+        entries = entries_func()
+        for number in itertools.count(1):
+            first = next(entries, None)
+            if first is None:
+                break
+            name = f"sitemap-{section}-{number}.xml"
+            newest = [None]
+            shard = itertools.chain([first], itertools.islice(entries, shard_size() - 1))
+            write_atomically(root / name, urlset(base_url, shard, newest))
+            shards.append((name, newest[0] or timezone.now()))
+
+    lines = [XML_HEAD, f"<sitemapindex {XMLNS}>\n"]
+    lines += [
+        f"<sitemap><loc>{escape(f'{base_url}/{name}')}</loc><lastmod>{lastmod.isoformat()}</lastmod></sitemap>\n"
+        for name, lastmod in shards
+    ]
+    lines.append("</sitemapindex>\n")
+    write_atomically(root / INDEX_NAME, lines)
+
+    # Shards left over from a larger corpus
+    written = {name for name, _ in shards}
+    for path in root.iterdir():
+        if SHARD_NAME.match(path.name) and path.name not in written:
+            path.unlink(missing_ok=True)
+    return [name for name, _ in shards]
+
+
+@task(max_attempts=3)
+def refresh_sitemaps():
+    write_sitemaps()
+
+
+def schedule_refresh(delay=None):
+    """
+    Regenerate the sitemaps after `delay` (default `SITEMAP_REFRESH_DELAY`) seconds; a burst of
+    changes queues a single refresh, brought forward when a shorter delay is asked for.
+    """
+    if delay is None:
+        delay = getattr(settings, "SITEMAP_REFRESH_DELAY", 60)
+    run_at = timezone.now() + timedelta(seconds=delay)
+    queued = Task.objects.filter(name=refresh_sitemaps.name, status=Task.Status.QUEUED)
+    if queued.exists():
+        queued.filter(run_at__gt=run_at).update(run_at=run_at)
+        return
+    refresh_sitemaps.enqueue(run_at=run_at)
+
+
+def sitemap_name(section=None, shard=None):
+    return INDEX_NAME if section is None else f"sitemap-{section}-{shard}.xml"
+
+
+def last_modified(request, section=None, shard=None):
+    path = sitemap_root() / sitemap_name(section, shard)
+    if not path.exists():
+        return None
+    return datetime.fromtimestamp(path.stat().st_mtime, tz=dt_timezone.utc)
+
+
+@condition(last_modified_func=last_modified)
+def sitemap_view(request, section=None, shard=None):
+    if not (sitemap_root() / INDEX_NAME).exists():
+        # Generating the whole corpus is the worker's job, not a request's
+        schedule_refresh(delay=0)
+        if not (sitemap_root() / INDEX_NAME).exists():  # Still missing unless tasks run eagerly
+            response = HttpResponse("Sitemaps are being generated.", status=503, content_type="text/plain")
+            response["Retry-After"] = RETRY_AFTER
+            return response
+    try:
+        return FileResponse(open(sitemap_root() / sitemap_name(section, shard), "rb"), content_type="application/xml")
+    except FileNotFoundError:
+        raise Http404("No such sitemap")
@@ -22,6 +22,7 @@ from django.urls import include, path
 
 from apps.home.views import home_view
 from apps.users.views import profile_view
+from core.sitemaps import sitemap_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -30,6 +31,8 @@ urlpatterns = [
     path("profile/", include("apps.users.urls")),
     path("@<username>/", profile_view, name="profile"),
     path("blog/", include("apps.blog.urls", namespace="blog")),
+    path("sitemap.xml", sitemap_view, name="sitemap"),
+    path("sitemap-<slug:section>-<int:shard>.xml", sitemap_view, name="sitemap-shard"),
 ]
 
 # Only used in development